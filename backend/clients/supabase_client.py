@@ -1,6 +1,10 @@
 import os
+import random
+import threading
+import time
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 import json
 from datetime import datetime
 from typing import Dict, List, Any
@@ -15,6 +19,13 @@ except ImportError:
     R2_AVAILABLE = False
     print("[ERROR] R2 storage is required but not available. Please install boto3 and configure R2 credentials.")
 
+# Optional fast JSON encoder for bulk writes (falls back to the standard json module)
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -25,14 +36,73 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("Missing SUPABASE_URL or SUPABASE_KEY in environment variables. Please check your .env file.")
 
+# Timeout for PostgREST requests (seconds); the client reuses keep-alive connections between calls
+DB_REQUEST_TIMEOUT = 30
+
+def _create_supabase_client() -> Client:
+    """Create the Supabase client used for all database access"""
+    return create_client(
+        SUPABASE_URL, SUPABASE_KEY,
+        options=ClientOptions(postgrest_client_timeout=DB_REQUEST_TIMEOUT)
+    )
+
 # Create Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase: Client = _create_supabase_client()
+
+# Parameter order of the insert_tracking_bulk SQL function (see database/supabase_tables.sql)
+TRACKING_BULK_PARAMS = (
+    "p_tracker_ids", "p_vehicle_types", "p_statuses", "p_compliance", "p_reaction_times",
+    "p_weather_conditions", "p_temperatures", "p_humidity", "p_visibility",
+    "p_precipitation_types", "p_wind_speeds", "p_dates",
+)
+
+# Columns read back from tracking_results (everything except bookkeeping timestamps)
+TRACKING_COLUMNS = (
+    "tracker_id,video_id,vehicle_type,status,compliance,reaction_time,weather_condition,"
+    "temperature,humidity,visibility,precipitation_type,wind_speed,date"
+)
 
 class SupabaseManager:
     """Supabase manager for SynerX with new video-based schema"""
     
     def __init__(self):
         self.client = supabase
+        # Cleared if the insert_tracking_bulk / upsert_vehicle_counts / get_max_tracker_id functions are not deployed
+        self._bulk_rpc_available = True
+        self._counts_rpc_available = True
+        self._max_id_rpc_available = True
+        # Serializes reconnects so I/O workers failing together rebuild the client only once
+        self._reconnect_lock = threading.Lock()
+    
+    def force_reconnect(self, failed_client: Client = None):
+        """Replace the client (and its connection pool) after a connection-level failure, closing the old pool"""
+        global supabase
+        with self._reconnect_lock:
+            if failed_client is not None and self.client is not failed_client:
+                return  # Another thread already replaced the client that failed
+            
+            old_client = self.client
+            supabase = _create_supabase_client()
+            self.client = supabase
+            try:
+                old_client.postgrest.session.close()
+            except Exception as e:
+                print(f"[WARNING] Failed to close the previous Supabase session: {e}")
+            print("[INFO] Reconnected to Supabase")
+    
+    def retry_db_operation(self, operation, retries: int = 3, base_delay: float = 0.5, max_delay: float = 5.0):
+        """Run operation(), reconnecting and retrying with jittered exponential backoff on connection errors"""
+        for attempt in range(retries + 1):
+            client = self.client
+            try:
+                return operation()
+            except httpx.TransportError as e:
+                if attempt == retries:
+                    raise
+                delay = min(base_delay * (2 ** attempt), max_delay) * random.uniform(0.5, 1.5)
+                print(f"[WARNING] Database connection error ({e}), retrying in {delay:.2f}s ({attempt + 1}/{retries})")
+                self.force_reconnect(client)
+                time.sleep(delay)
     
     def create_video_record(self, video_data: Dict[str, Any]) -> int:
         """Create a new video record and return the video_id"""
@@ -255,6 +325,154 @@ class SupabaseManager:
             print(f"❌ Batch save failed: {e}")
             return False
     
+    def _post_rows_raw(self, table: str, rows: List[Dict[str, Any]], on_conflict: str) -> None:
+        """POST pre-built rows straight to PostgREST as one JSON body (upsert on on_conflict)"""
+        if HAS_ORJSON:
+            body = orjson.dumps(rows, option=orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            body = json.dumps(rows, default=lambda val: val.item() if isinstance(val, np.generic) else str(val))
+        
+        response = self.retry_db_operation(lambda: self.client.postgrest.session.post(
+            f"/{table}",
+            params={"on_conflict": on_conflict},
+            content=body,
+            headers={
+                "Content-Type": "application/json",
+                "Prefer": "resolution=merge-duplicates,return=minimal",
+            },
+        ))
+        response.raise_for_status()
+    
+    def save_tracking_data_bulk_raw(self, tracking_data_list: List[Dict[str, Any]], video_id: int, default_date: str = None) -> bool:
+        """Upsert tracking records with a single pre-serialized request, falling back to save_tracking_data_batch"""
+        if not tracking_data_list:
+            return True
+        
+        if default_date is None:
+            default_date = datetime.now().isoformat()
+        
+        rows = [
+            {
+                "tracker_id": data.get("tracker_id"),
+                "video_id": video_id,
+                "vehicle_type": data.get("vehicle_type"),
+                "status": data.get("status"),
+                "compliance": data.get("compliance", 0),
+                "reaction_time": data.get("reaction_time"),
+                "weather_condition": data.get("weather_condition"),
+                "temperature": data.get("temperature"),
+                "humidity": data.get("humidity"),
+                "visibility": data.get("visibility"),
+                "precipitation_type": data.get("precipitation_type"),
+                "wind_speed": data.get("wind_speed"),
+                "date": data.get("date", default_date),
+            }
+            for data in tracking_data_list
+        ]
+        
+        try:
+            self._post_rows_raw("tracking_results", rows, "tracker_id")
+            print(f"✅ Successfully saved {len(rows)} records in bulk for video {video_id}")
+            return True
+        except Exception as e:
+            print(f"[WARNING] Bulk save failed, using batch upsert instead: {e}")
+            return self.save_tracking_data_batch(rows, video_id)
+    
+    def save_tracking_data_columnar(self, tracking_data_list: List[Dict[str, Any]], video_id: int) -> bool:
+        """Upsert tracking records through the insert_tracking_bulk RPC as parallel arrays"""
+        if not tracking_data_list:
+            return True
+        if not self._bulk_rpc_available:
+            return self.save_tracking_data_bulk_raw(tracking_data_list, video_id)
+        
+        def to_py(val):
+            if isinstance(val, np.generic):
+                return val.item()
+            return val
+        
+        # One tuple per record, transposed into the parallel arrays the RPC expects (a missing date defaults to NOW())
+        rows = [
+            (
+                to_py(data.get("tracker_id")),
+                data.get("vehicle_type"),
+                data.get("status"),
+                to_py(data.get("compliance", 0)),
+                to_py(data.get("reaction_time")),
+                data.get("weather_condition"),
+                to_py(data.get("temperature")),
+                to_py(data.get("humidity")),
+                to_py(data.get("visibility")),
+                data.get("precipitation_type"),
+                to_py(data.get("wind_speed")),
+                data.get("date"),
+            )
+            for data in tracking_data_list
+        ]
+        columns = dict(zip(TRACKING_BULK_PARAMS, map(list, zip(*rows))))
+        
+        try:
+            params = {"p_video_id": video_id, **columns}
+            self.retry_db_operation(lambda: self.client.rpc("insert_tracking_bulk", params).execute())
+            print(f"✅ Successfully saved {len(tracking_data_list)} records via bulk RPC for video {video_id}")
+            return True
+        except Exception as e:
+            if getattr(e, "code", None) == "PGRST202":
+                # Function not found - stop trying it for the rest of the process
+                self._bulk_rpc_available = False
+            print(f"[WARNING] Bulk RPC save failed, using row upsert instead: {e}")
+            return self.save_tracking_data_bulk_raw(tracking_data_list, video_id)
+    
+    def save_vehicle_counts_rpc(self, vehicle_counter: Dict[str, int], date: str, video_id: int) -> bool:
+        """Upsert one day's vehicle counts through the upsert_vehicle_counts RPC as parallel arrays"""
+        if not vehicle_counter:
+            return True
+        
+        if self._counts_rpc_available:
+            params = {
+                "p_video_id": video_id,
+                "p_date": date,
+                "p_vehicle_types": list(vehicle_counter.keys()),
+                "p_counts": [int(count) for count in vehicle_counter.values()],
+            }
+            try:
+                self.retry_db_operation(lambda: self.client.rpc("upsert_vehicle_counts", params).execute())
+                print(f"✅ Successfully saved {len(vehicle_counter)} vehicle counts via RPC for video {video_id}")
+                return True
+            except Exception as e:
+                if getattr(e, "code", None) == "PGRST202":
+                    # Function not found - stop trying it for the rest of the process
+                    self._counts_rpc_available = False
+                print(f"[WARNING] Vehicle count RPC failed, using row upsert instead: {e}")
+        
+        return self.save_vehicle_count_bulk_raw(
+            [{"vehicle_type": vehicle_type, "count": count, "date": date} for vehicle_type, count in vehicle_counter.items()],
+            video_id
+        )
+    
+    def save_vehicle_count_bulk_raw(self, vehicle_counts: List[Dict[str, Any]], video_id: int) -> bool:
+        """Upsert vehicle counts with a single pre-serialized request, falling back to save_vehicle_count_batch"""
+        if not vehicle_counts:
+            return True
+        
+        default_date = datetime.now().strftime("%Y-%m-%d")
+        rows = [
+            {
+                "video_id": video_id,
+                "vehicle_type": count_data.get("vehicle_type"),
+                "count": count_data.get("count"),
+                "date": count_data.get("date", default_date),
+            }
+            for count_data in vehicle_counts
+        ]
+        
+        try:
+            self._post_rows_raw("vehicle_counts", rows, "video_id,vehicle_type,date")
+            print(f"✅ Successfully saved {len(rows)} vehicle counts in bulk for video {video_id}")
+            return True
+        except Exception as e:
+            print(f"[WARNING] Bulk count save failed, using batch upsert instead: {e}")
+            return self.save_vehicle_count_batch(rows, video_id)
+    
     def save_vehicle_count_batch(self, vehicle_counts: List[Dict[str, Any]], video_id: int) -> bool:
         """Save multiple vehicle counts in one batch operation with video_id link"""
         try:
@@ -327,27 +545,72 @@ class SupabaseManager:
     
     def get_tracking_data(self, limit: int = 1000, video_id: int = None) -> List[Dict]:
         """Retrieve tracking data from Supabase, optionally filtered by video_id"""
-        try:
+        def run_query():
             query = self.client.table("tracking_results").select("*").order("created_at", desc=True)
             
             if video_id is not None:
                 query = query.eq("video_id", video_id)
             
-            result = query.limit(limit).execute()
+            return query.limit(limit).execute()
+        
+        try:
+            result = self.retry_db_operation(run_query)
             return result.data
         except Exception as e:
             print(f"[ERROR] Failed to retrieve tracking data: {e}")
             return []
     
+    def get_max_tracker_id(self, retries: int = 1) -> int:
+        """Highest tracker_id through the get_max_tracker_id RPC, or the newest row if the function is not deployed"""
+        if self._max_id_rpc_available:
+            try:
+                result = self.retry_db_operation(lambda: self.client.rpc("get_max_tracker_id").execute(), retries=retries)
+                return int(result.data or 0)
+            except Exception as e:
+                if getattr(e, "code", None) != "PGRST202":
+                    raise
+                # Function not found - stop trying it for the rest of the process
+                self._max_id_rpc_available = False
+                print(f"[WARNING] get_max_tracker_id RPC not deployed, using ordered select instead: {e}")
+        
+        result = self.retry_db_operation(
+            lambda: self.client.table("tracking_results")
+                .select("tracker_id")
+                .order("tracker_id", desc=True)
+                .limit(1)
+                .execute(),
+            retries=retries
+        )
+        return int(result.data[0]["tracker_id"]) if result.data else 0
+    
+    def iter_tracking_data(self, video_id: int = None, columns: str = TRACKING_COLUMNS, page_size: int = 1000):
+        """Yield all tracking rows (narrow select), paging through them by tracker_id"""
+        offset = 0
+        while True:
+            def run_query():
+                query = self.client.table("tracking_results").select(columns)
+                if video_id is not None:
+                    query = query.eq("video_id", video_id)
+                return query.order("tracker_id").range(offset, offset + page_size - 1).execute()
+            
+            rows = self.retry_db_operation(run_query).data or []
+            yield from rows
+            if len(rows) < page_size:
+                return
+            offset += page_size
+    
     def get_vehicle_counts(self, limit: int = 1000, video_id: int = None) -> List[Dict]:
         """Retrieve vehicle count data from Supabase, optionally filtered by video_id"""
-        try:
+        def run_query():
             query = self.client.table("vehicle_counts").select("*").order("created_at", desc=True)
             
             if video_id is not None:
                 query = query.eq("video_id", video_id)
             
-            result = query.limit(limit).execute()
+            return query.limit(limit).execute()
+        
+        try:
+            result = self.retry_db_operation(run_query)
             return result.data
         except Exception as e:
             print(f"[ERROR] Failed to retrieve vehicle counts: {e}")
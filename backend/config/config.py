@@ -174,6 +174,7 @@ class Config:
     STREAMING_QUEUE_SIZE = _parse_int('STREAMING_QUEUE_SIZE', 4)  # Slightly larger buffer for quality
     STREAMING_WORKERS = _parse_int('STREAMING_WORKERS', 4)  # More workers for better quality processing
     STREAMING_TARGET_FPS = _parse_int('STREAMING_TARGET_FPS', 30)  # Target 30 FPS for smooth playback
+    STREAMING_SEND_TIMEOUT = _parse_float('STREAMING_SEND_TIMEOUT', 2.0)  # Seconds a client may take to accept one frame before it is dropped
     
     # Conditional interpolation based on environment
     try:
@@ -189,12 +190,14 @@ class Config:
     # ANNOTATION_SKIP_FRAMES = 3  # Disabled for consistent label display
     ENABLE_BATCH_PROCESSING = False  # Enable batch processing (experimental)
     MAX_DETECTIONS_PER_FRAME = 50  # Limit detections per frame for performance
+    ENABLE_DEBUG_LOGS = _parse_bool('ENABLE_DEBUG_LOGS', False)  # Print per-vehicle [DEBUG] events during processing
     
     # Tracking Stability Settings
     ENABLE_TRACKING_SMOOTHING = True  # Enable tracking smoothing for stable labels
     TRACKING_HISTORY_LENGTH = 10  # Number of frames to keep tracking history
     MIN_TRACKING_CONFIDENCE = 0.2  # Minimum confidence to maintain tracking
     TRACKING_PREDICTION_FRAMES = 3  # Number of frames to predict when tracking is lost
+    TRACK_STATE_TTL_FRAMES = _parse_int('TRACK_STATE_TTL_FRAMES', 300)  # Drop per-track state after this many processed frames unseen (well above ByteTrack's 30-frame lost buffer)
     
     
     # Weather API Performance Settings
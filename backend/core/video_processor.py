@@ -11,7 +11,7 @@ import supervision as sv
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.config import Config
-from utils.data_manager import DataManager
+from utils.data_manager import DataManager, TrackerIdUnavailableError
 from utils.heatmap import HeatMapGenerator
 from utils.view_transformer import ViewTransformer
 from utils.vehicle_tracker import VehicleTracker
@@ -198,8 +198,16 @@ class VideoProcessor:
         # Initialize vehicle processor with video_id
         self.vehicle_processor = VehicleProcessor(self.vehicle_tracker, self.data_manager, self.mode, self.video_id)
         self.vehicle_processor.initialize_data()
-        self.vehicle_processor.load_existing_counts()
-        self.vehicle_processor.setup_tracker_offset()
+        
+        # Both startup queries are independent round-trips, so overlap them
+        counts_future = self.data_manager.submit_io(self.vehicle_processor.load_existing_counts)
+        offset_future = self.data_manager.submit_io(self.vehicle_processor.setup_tracker_offset)
+        counts_future.result()
+        try:
+            offset_future.result()
+        except TrackerIdUnavailableError as e:
+            print(f"[ERROR] Cannot start processing video {self.video_id}: tracker ids are unavailable - {e}")
+            raise
         
         # Print initialization info
         self._print_initialization_info()
@@ -124,6 +124,119 @@ next_id := nextval('tracker_id_seq');
 RETURN next_id;
 END;
 $$ LANGUAGE plpgsql;
+-- Highest tracker_id as a scalar (index-only scan on the primary key)
+CREATE OR REPLACE FUNCTION get_max_tracker_id() RETURNS INTEGER AS $$
+SELECT COALESCE(MAX(tracker_id), 0)
+FROM tracking_results;
+$$ LANGUAGE sql STABLE;
+-- Bulk upsert of tracking results from parallel arrays (one row per array index)
+CREATE OR REPLACE FUNCTION insert_tracking_bulk(
+        p_video_id INTEGER,
+        p_tracker_ids INTEGER [],
+        p_vehicle_types TEXT [],
+        p_statuses TEXT [],
+        p_compliance INTEGER [],
+        p_reaction_times DECIMAL [],
+        p_weather_conditions TEXT [],
+        p_temperatures DECIMAL [],
+        p_humidity INTEGER [],
+        p_visibility DECIMAL [],
+        p_precipitation_types TEXT [],
+        p_wind_speeds DECIMAL [],
+        p_dates TIMESTAMP WITH TIME ZONE []
+    ) RETURNS INTEGER AS $$
+DECLARE affected INTEGER;
+BEGIN
+INSERT INTO tracking_results (
+        tracker_id,
+        video_id,
+        vehicle_type,
+        status,
+        compliance,
+        reaction_time,
+        weather_condition,
+        temperature,
+        humidity,
+        visibility,
+        precipitation_type,
+        wind_speed,
+        date
+    )
+SELECT t.tracker_id,
+    p_video_id,
+    t.vehicle_type,
+    t.status,
+    COALESCE(t.compliance, 0),
+    t.reaction_time,
+    t.weather_condition,
+    t.temperature,
+    t.humidity,
+    t.visibility,
+    t.precipitation_type,
+    t.wind_speed,
+    COALESCE(t.date, NOW())
+FROM unnest(
+        p_tracker_ids,
+        p_vehicle_types,
+        p_statuses,
+        p_compliance,
+        p_reaction_times,
+        p_weather_conditions,
+        p_temperatures,
+        p_humidity,
+        p_visibility,
+        p_precipitation_types,
+        p_wind_speeds,
+        p_dates
+    ) AS t(
+        tracker_id,
+        vehicle_type,
+        status,
+        compliance,
+        reaction_time,
+        weather_condition,
+        temperature,
+        humidity,
+        visibility,
+        precipitation_type,
+        wind_speed,
+        date
+    ) ON CONFLICT (tracker_id) DO
+UPDATE
+SET video_id = EXCLUDED.video_id,
+    vehicle_type = EXCLUDED.vehicle_type,
+    status = EXCLUDED.status,
+    compliance = EXCLUDED.compliance,
+    reaction_time = EXCLUDED.reaction_time,
+    weather_condition = EXCLUDED.weather_condition,
+    temperature = EXCLUDED.temperature,
+    humidity = EXCLUDED.humidity,
+    visibility = EXCLUDED.visibility,
+    precipitation_type = EXCLUDED.precipitation_type,
+    wind_speed = EXCLUDED.wind_speed,
+    date = EXCLUDED.date,
+    updated_at = NOW();
+GET DIAGNOSTICS affected = ROW_COUNT;
+RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+-- Upsert all vehicle counts of one video and day in a single statement
+CREATE OR REPLACE FUNCTION upsert_vehicle_counts(
+        p_video_id INTEGER,
+        p_date DATE,
+        p_vehicle_types TEXT [],
+        p_counts INTEGER []
+    ) RETURNS VOID AS $$ BEGIN
+INSERT INTO vehicle_counts (video_id, vehicle_type, count, date)
+SELECT p_video_id,
+    t.vehicle_type,
+    t.count,
+    p_date
+FROM unnest(p_vehicle_types, p_counts) AS t(vehicle_type, count) ON CONFLICT (video_id, vehicle_type, date) DO
+UPDATE
+SET count = EXCLUDED.count;
+END;
+$$ LANGUAGE plpgsql;
 -- Video statistics update function
 CREATE OR REPLACE FUNCTION update_video_stats(
         p_video_id INTEGER,
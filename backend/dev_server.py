@@ -6,28 +6,33 @@ import signal
 import sys
 import subprocess
 import os
-import time
 import psutil
 
+server_process = None  # uvicorn subprocess started by main()
+
 def kill_port_8000():
     """Kill any process using port 8000"""
     print("🔍 Looking for processes using port 8000...")
     killed_count = 0
     
     try:
-        # Find processes using port 8000
-        for proc in psutil.process_iter(['pid', 'name', 'connections']):
-            try:
-                connections = proc.info['connections']
-                if connections:
-                    for conn in connections:
-                        if conn.laddr.port == 8000:
-                            print(f"💀 Killing process {proc.info['pid']} ({proc.info['name']}) using port 8000")
-                            proc.kill()
-                            killed_count += 1
-                            break
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
+        # Find processes using port 8000 with one system-wide socket table read
+        try:
+            pids = {conn.pid for conn in psutil.net_connections(kind='tcp')
+                    if conn.pid and conn.laddr and conn.laddr.port == 8000}
+        except psutil.AccessDenied:
+            # Some platforms only expose other processes' sockets per process
+            pids = set()
+            for proc in psutil.process_iter(['pid', 'net_connections']):
+                connections = proc.info['net_connections']
+                if connections and any(conn.laddr and conn.laddr.port == 8000 for conn in connections):
+                    pids.add(proc.info['pid'])
+        
+        pids.discard(os.getpid())
+        for pid in pids:
+            print(f"💀 Killing process {pid} using port 8000")
+            if kill_pid(pid):
+                killed_count += 1
         
         if killed_count == 0:
             print("ℹ️ No processes found using port 8000")
@@ -39,65 +44,157 @@ def kill_port_8000():
     
     return killed_count
 
-def kill_uvicorn_processes():
+def _snapshot_procfs():
+    """Read name, ppid and cmdline straight from /proc (Linux), skipping psutil's per-process setup"""
+    snapshot = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read()
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                cmdline = f.read()
+        except OSError:
+            continue  # Process exited or is not readable
+        
+        # stat is "pid (comm) state ppid ..."; comm may itself contain spaces or parentheses
+        comm_end = stat.rfind(b')')
+        name = stat[stat.find(b'(') + 1:comm_end].decode(errors='replace')
+        ppid = int(stat[comm_end + 2:].split(maxsplit=2)[1])
+        snapshot[pid] = {
+            'pid': pid,
+            'name': name,
+            'ppid': ppid,
+            'cmdline': [arg.decode(errors='replace') for arg in cmdline.split(b'\0') if arg],
+        }
+    return snapshot
+
+def snapshot_processes():
+    """Walk the process table once, returning {pid: info} with name, ppid and cmdline"""
+    if sys.platform.startswith('linux'):
+        return _snapshot_procfs()
+    
+    snapshot = {}
+    for proc in psutil.process_iter(['pid', 'name', 'ppid', 'cmdline']):
+        snapshot[proc.info['pid']] = proc.info
+    return snapshot
+
+def descendant_pids(snapshot, root_pid):
+    """Collect all descendants of root_pid from a process snapshot by following the ppid chain"""
+    children_of = {}
+    for pid, info in snapshot.items():
+        children_of.setdefault(info['ppid'], []).append(pid)
+    
+    descendants = []
+    stack = list(children_of.get(root_pid, ()))
+    while stack:
+        pid = stack.pop()
+        descendants.append(pid)
+        stack.extend(children_of.get(pid, ()))
+    return descendants
+
+def kill_pid(pid):
+    """Kill a single pid, ignoring processes that are already gone"""
+    try:
+        psutil.Process(pid).kill()
+        return True
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return False
+
+def kill_uvicorn_processes(snapshot=None):
     """Kill all uvicorn processes"""
     print("🔍 Looking for uvicorn processes...")
     killed_count = 0
     
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-        try:
-            proc_info = proc.info
-            if proc_info['name'] and 'uvicorn' in proc_info['name'].lower():
-                print(f"💀 Killing uvicorn process {proc_info['pid']}")
-                proc.kill()
-                killed_count += 1
-            elif proc_info['cmdline'] and any('uvicorn' in str(arg).lower() for arg in proc_info['cmdline']):
-                print(f"💀 Killing uvicorn process {proc_info['pid']} (by cmdline)")
-                proc.kill()
-                killed_count += 1
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
+    if snapshot is None:
+        snapshot = snapshot_processes()
+    
+    for pid, proc_info in snapshot.items():
+        if proc_info['name'] and 'uvicorn' in proc_info['name'].lower():
+            print(f"💀 Killing uvicorn process {pid}")
+        elif proc_info['cmdline'] and any('uvicorn' in str(arg).lower() for arg in proc_info['cmdline']):
+            print(f"💀 Killing uvicorn process {pid} (by cmdline)")
+        else:
+            continue
+        if kill_pid(pid):
+            killed_count += 1
     
     print(f"✅ Killed {killed_count} uvicorn processes")
     return killed_count
 
-def signal_handler(sig, frame):
-    """Handle Ctrl+C gracefully by immediately killing localhost server"""
-    print('\n🛑 Shutting down development server...')
-    
-    # First, kill processes using port 8000 (most important)
-    kill_port_8000()
+def kill_child_processes():
+    """Terminate, then force kill, every descendant of this process (and any uvicorn process)"""
+    # One walk of the process table serves both the uvicorn scan and the child tree
+    snapshot = snapshot_processes()
     
     # Then kill uvicorn processes
-    kill_uvicorn_processes()
-    
-    # Get current process
-    current_process = psutil.Process()
+    kill_uvicorn_processes(snapshot)
     
-    # Kill all child processes
-    for child in current_process.children(recursive=True):
+    # Kill all child processes (names come from the snapshot, no per-child lookup)
+    children = []
+    for pid in descendant_pids(snapshot, os.getpid()):
         try:
-            print(f"🔄 Stopping process {child.pid} ({child.name()})")
+            child = psutil.Process(pid)
+            print(f"🔄 Stopping process {pid} ({snapshot[pid]['name']})")
             child.terminate()
-        except psutil.NoSuchProcess:
+            children.append(child)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
             pass
     
-    # Wait a bit for graceful shutdown
-    time.sleep(0.5)
+    # Give them up to 0.5s for graceful shutdown, returning as soon as all have exited
+    _, alive = psutil.wait_procs(children, timeout=0.5)
     
     # Force kill any remaining children
-    for child in current_process.children(recursive=True):
+    for child in alive:
         try:
             print(f"💀 Force killing process {child.pid}")
             child.kill()
         except psutil.NoSuchProcess:
             pass
+
+def kill_server_group(timeout=0.5):
+    """Signal the server's process group (POSIX only); returns False when there is no group to signal"""
+    if server_process is None or not hasattr(os, 'killpg'):
+        return False
+    
+    pgid = server_process.pid  # Started with start_new_session, so the server leads its own group
+    try:
+        print(f"🔄 Stopping server process group {pgid}")
+        os.killpg(pgid, signal.SIGTERM)
+        try:
+            server_process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            pass
+        # Reloader workers can outlive the leader; SIGKILL whatever is left in the group
+        os.killpg(pgid, signal.SIGKILL)
+        print(f"💀 Force killed remaining processes in group {pgid}")
+    except ProcessLookupError:
+        pass  # Whole group already exited
+    return True
+
+def signal_handler(sig, frame):
+    """Handle Ctrl+C gracefully by immediately killing localhost server"""
+    print('\n🛑 Shutting down development server...')
+    
+    # On POSIX the server, its reloader and workers share one process group: two signals stop them all
+    group_killed = kill_server_group()
+    
+    # Kill anything else still holding port 8000 (most important)
+    kill_port_8000()
+    
+    # Without a process group (Windows), walk the process tree instead
+    if not group_killed:
+        kill_child_processes()
     
     print('✅ Localhost server killed')
     os._exit(0)  # Force exit to bypass any hanging threads
 
 def main():
     """Run the development server with proper process management"""
+    global server_process
+    
     # Register signal handler for Ctrl+C
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -110,17 +207,17 @@ def main():
     
     try:
         # Run uvicorn as a subprocess for better control
-        process = subprocess.Popen([
+        server_process = subprocess.Popen([
             sys.executable, "-m", "uvicorn",
             "main:app",
             "--reload",
             "--host", "0.0.0.0",
             "--port", "8000",
             "--log-level", "info"
-        ])
+        ], start_new_session=hasattr(os, 'killpg'))  # Own process group on POSIX for one-shot shutdown
         
         # Wait for the process to complete
-        process.wait()
+        server_process.wait()
         
     except KeyboardInterrupt:
         print('\n🛑 Keyboard interrupt received...')
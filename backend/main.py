@@ -865,32 +865,23 @@ async def websocket_video_stream(websocket: WebSocket, client_id: str):
         # Keep connection alive and handle messages
         while True:
             try:
-                # Check for pending messages from video streamer
-                if hasattr(video_streamer, '_pending_message') and video_streamer._pending_message:
-                    try:
-                        await websocket.send_text(video_streamer._pending_message)
-                        video_streamer._pending_message = None
-                    except Exception as e:
-                        print(f"[WS] Error sending message to {client_id}: {e}")
-                        break
-                
-                # Wait for any message from client (ping/pong) with timeout
+                # Frames are pushed by video_streamer's broadcast; wait for client ping/pong with timeout
                 try:
                     data = await asyncio.wait_for(websocket.receive_text(), timeout=0.1)
                     try:
                         message = json.loads(data)
                         if message.get("type") == "ping":
                             response = {"type": "pong", "timestamp": time.time()}
-                            await websocket.send_text(json.dumps(response))
+                            await video_streamer.send_text(websocket, client_id, json.dumps(response))
                     except json.JSONDecodeError:
                         # Handle non-JSON messages
                         response = {"type": "pong", "timestamp": time.time()}
-                        await websocket.send_text(json.dumps(response))
+                        await video_streamer.send_text(websocket, client_id, json.dumps(response))
                 except asyncio.TimeoutError:
                     # Send ping to keep connection alive
                     try:
                         ping_message = {"type": "ping", "timestamp": time.time()}
-                        await websocket.send_text(json.dumps(ping_message))
+                        await video_streamer.send_text(websocket, client_id, json.dumps(ping_message))
                     except Exception as e:
                         print(f"[WS] Error sending ping to {client_id}: {e}")
                         break
@@ -0,0 +1,52 @@
+import sys
+import types
+import numpy as np
+
+
+def _install_fake_modules():
+    """Install minimal fake 'supervision' and 'config.config' modules so
+    `utils.annotation_manager` imports without the real packages or a .env file.
+    """
+    sys.modules['supervision'] = types.SimpleNamespace()
+    sys.modules['config'] = types.SimpleNamespace()
+    sys.modules['config.config'] = types.SimpleNamespace(Config=types.SimpleNamespace())
+
+
+def test_points_inside_polygon_matches_cv2_including_boundary():
+    _install_fake_modules()
+    from utils.annotation_manager import AnnotationManager
+
+    rng = np.random.default_rng(0)
+    polygons = [
+        np.array([[507, 199], [681, 209], [751, 555], [484, 541]]),  # .env.example stop zone
+        np.array([[422, 10], [594, 16], [801, 665], [535, 649]]),
+        np.array([[0, 0], [10, 0], [10, 10], [0, 10]]),  # Axis-aligned edges
+        np.array([[0, 0], [10, 0], [10, 10], [5, 3], [0, 10]]),  # Concave
+    ]
+
+    for polygon in polygons:
+        lo, hi = polygon.min(axis=0) - 5, polygon.max(axis=0) + 5
+        edge_midpoints = (polygon + np.roll(polygon, -1, axis=0)) / 2
+        points = np.vstack([
+            polygon.astype(float),  # Vertices
+            edge_midpoints,
+            rng.integers(lo, hi + 1, size=(5000, 2)).astype(float),  # Integer anchors land on edges often
+            rng.uniform(lo, hi, size=(5000, 2)),
+        ])
+
+        expected = np.array([AnnotationManager.point_inside_polygon(p, polygon) for p in points])
+        edges = AnnotationManager.polygon_edges(polygon)
+        np.testing.assert_array_equal(AnnotationManager.points_inside_polygon(points, edges=edges), expected)
+        np.testing.assert_array_equal(AnnotationManager.points_inside_polygon(points, polygon), expected)
+
+        # Every vertex and edge midpoint counts as inside, like cv2 (>= 0)
+        assert AnnotationManager.points_inside_polygon(polygon, polygon).all()
+        assert AnnotationManager.points_inside_polygon(edge_midpoints, polygon).all()
+
+
+def test_points_inside_polygon_empty_input():
+    _install_fake_modules()
+    from utils.annotation_manager import AnnotationManager
+
+    square = np.array([[0, 0], [10, 0], [10, 10], [0, 10]])
+    assert AnnotationManager.points_inside_polygon(np.empty((0, 2)), square).shape == (0,)
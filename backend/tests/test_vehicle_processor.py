@@ -0,0 +1,146 @@
+import sys
+import types
+import numpy as np
+
+
+def _install_fake_modules():
+    """Install minimal fake 'supervision', 'config.config' and 'utils.weather_manager' modules so
+    `utils.vehicle_processor` imports without the real packages, a .env file or network access.
+    """
+    sys.modules['supervision'] = types.SimpleNamespace()
+    fake_config = types.SimpleNamespace(
+        FRAME_BUFFER=5,
+        CLASS_HISTORY_FRAMES=10,
+        CLASS_CONFIDENCE_THRESHOLD=0.5,
+        DETECTION_OVERLAP_THRESHOLD=0.5,
+        CLASS_NAMES={2: "car", 3: "motorcycle", 5: "bus", 7: "truck"},
+        VELOCITY_THRESHOLD=0.6,
+        STOP_ZONE_POLYGON=np.array([[0, 0], [100, 0], [100, 100], [0, 100]]),
+        TRACK_STATE_TTL_FRAMES=40,
+        ENABLE_DEBUG_LOGS=False,
+        ENABLE_WEATHER_API=False,
+        WEATHER_CACHE_DURATION=600,
+    )
+    sys.modules['config'] = types.SimpleNamespace()
+    sys.modules['config.config'] = types.SimpleNamespace(Config=fake_config)
+    sys.modules['utils.weather_manager'] = types.SimpleNamespace(weather_manager=None)
+    # Re-import against these fakes even if another test file imported the modules first
+    sys.modules.pop('utils.vehicle_tracker', None)
+    sys.modules.pop('utils.vehicle_processor', None)
+
+
+def _make_processor():
+    _install_fake_modules()
+    from utils.vehicle_tracker import VehicleTracker
+    from utils.vehicle_processor import VehicleProcessor
+    return VehicleProcessor(VehicleTracker(), None, "api", video_id=1)
+
+
+def _reference_velocity(positions):
+    """The original per-track np.linalg.norm + np.average velocity over a float64 history"""
+    displacements = np.array([np.linalg.norm(positions[i] - positions[i - 1]) for i in range(1, len(positions))])
+    weights = np.linspace(1, 2, len(displacements))
+    return np.average(displacements, weights=weights)
+
+
+def test_stationary_track_ids_match_reference():
+    processor = _make_processor()
+    import utils.vehicle_processor as vehicle_processor
+    from collections import deque
+
+    config = vehicle_processor.Config
+    rng = np.random.default_rng(0)
+    history = processor.vehicle_tracker.position_history
+    reference = {tid: deque(maxlen=config.FRAME_BUFFER) for tid in range(30)}
+
+    # Step sizes straddle VELOCITY_THRESHOLD so both outcomes occur; some tracks never fill their window
+    step_scale = rng.uniform(0.1, 1.2, size=30)
+    outcomes = set()
+    position = rng.uniform(0, 500, size=(30, 2))
+    for frame in range(12):
+        for tid in range(30):
+            if tid % 6 == 0 and frame > 2:
+                continue
+            position[tid] += rng.normal(0, step_scale[tid], size=2)
+            history.append(tid, position[tid])
+            reference[tid].append(position[tid].copy())
+
+        track_ids = np.arange(30)
+        stationary = processor._stationary_track_ids(track_ids)
+
+        for tid in range(30):
+            if len(reference[tid]) < config.FRAME_BUFFER:
+                assert tid not in stationary
+                continue
+            velocity = _reference_velocity(list(reference[tid]))
+            # Positions are stored as float32 now; only velocities within rounding of the threshold may differ
+            if abs(velocity - config.VELOCITY_THRESHOLD) > 1e-4:
+                assert (tid in stationary) == (velocity < config.VELOCITY_THRESHOLD)
+                outcomes.add(tid in stationary)
+
+    assert outcomes == {True, False}
+    assert processor._stationary_track_ids(np.array([], dtype=np.int64)) == set()
+
+
+def test_weighted_velocities_numba_kernel_matches_numpy_path():
+    _install_fake_modules()
+    import utils.vehicle_processor as vehicle_processor
+
+    rng = np.random.default_rng(1)
+    for count, window in ((1, 2), (7, 5), (64, 12)):
+        windows = rng.uniform(0, 300, size=(count, window, 2)).astype(np.float32)
+        weights, weight_sum = vehicle_processor._velocity_weights(window - 1)
+        np.testing.assert_allclose(
+            vehicle_processor._weighted_velocities(windows, weights, weight_sum),
+            vehicle_processor._weighted_velocities_numpy(windows, weights, weight_sum),
+            rtol=1e-5,
+        )
+
+
+def test_evicting_stale_tracks_keeps_counts_and_records():
+    processor = _make_processor()
+    tracker = processor.vehicle_tracker
+    ttl = 40  # TRACK_STATE_TTL_FRAMES in the fake config
+
+    # Track 1 enters the stop zone, stops and is counted; track 2 stays in view
+    processor._frame_time = 0.0
+    for track_id in (1, 2):
+        tracker.position_history.append(track_id, np.array([50.0, 50.0]))
+        tracker.class_history.append(track_id, 2)
+        tracker.stable_class[track_id] = 2
+        tracker.status_cache[track_id] = "stationary"
+        processor.tracker_types[track_id] = "car"
+        processor._process_stop_zone_vehicle(track_id, "car", True, "moving", 0)
+    processor._apply_new_vehicle_counts()
+    processor.changed_records[1] = {"tracker_id": 1, "status": "stationary"}
+
+    processor._mark_seen(np.array([1, 2]))
+    for _ in range(ttl + processor.TRACK_EVICTION_INTERVAL):
+        processor._mark_seen(np.array([2]))
+
+    # Track 1 is gone for good: all its per-track working state is dropped
+    assert 1 not in processor._last_seen
+    assert 1 not in processor.tracker_types
+    assert tracker.position_history.count(1) == 0
+    assert tracker.class_history.count(1) == 0
+    assert 1 not in tracker.stable_class
+    assert 1 not in tracker.status_cache
+    assert 1 not in tracker.entry_times
+    assert 1 not in tracker.reaction_times
+    assert (1, "entered") not in tracker.written_records
+
+    # Counts and pending records survive, so a returning id is not counted twice
+    assert processor.counted_ids == {1, 2}
+    assert processor.vehicle_type_counter == {"car": 2}
+    assert processor.session_tracker_ids == {1, 2}
+    assert 1 in processor.changed_records
+    processor._new_vehicle_ids, processor._new_vehicle_types = [], []  # As process_detections does per frame
+    processor._process_stop_zone_vehicle(1, "car", False, "moving", 0)
+    processor._apply_new_vehicle_counts()
+    assert processor.vehicle_type_counter == {"car": 2}
+
+    # Track 2 is still in view and keeps its state
+    assert 2 in processor._last_seen
+    assert processor.tracker_types[2] == "car"
+    assert tracker.position_history.count(2) == 1
+    assert tracker.stable_class[2] == 2
@@ -24,6 +24,8 @@ def _install_fake_supervision_module():
     """
     mod = types.SimpleNamespace(Detections=_FakeDetections)
     sys.modules['supervision'] = mod
+    # Another test file may have imported the module against a different fake
+    sys.modules.pop('utils.vehicle_tracker', None)
 
 
 def _install_fake_config_module():
@@ -120,3 +122,186 @@ def test_tracker_performance_merge_and_class_updates():
     # Keep thresholds generous for CI machines; these should be fast on modern dev boxes
     assert merge_time < 1.5, f"merge took too long: {merge_time:.2f}s"
     assert update_time < 1.5, f"class updates took too long: {update_time:.2f}s"
+
+
+def test_position_history_matches_bounded_deque():
+    _install_fake_supervision_module()
+    _install_fake_config_module()
+    from collections import deque
+    from utils.vehicle_tracker import PositionHistory
+
+    history = PositionHistory(window=5, capacity=2)
+    reference = {tid: deque(maxlen=5) for tid in range(4)}
+
+    # Interleave appends across more trackers than the initial capacity to force growth
+    for step in range(12):
+        for tid in range(4):
+            point = (step * 1.5 + tid, step - tid)
+            history.append(tid, point)
+            reference[tid].append(point)
+        if step == 6:
+            history.clear(1)
+            reference[1].clear()
+
+    for tid, expected in reference.items():
+        assert history.count(tid) == len(expected)
+        np.testing.assert_allclose(history.get(tid), np.array(expected).reshape(-1, 2))
+
+    history.clear(3)
+    assert history.count(3) == 0
+    assert history.get(3).shape == (0, 2)
+
+
+def test_class_history_majority_matches_counter_most_common():
+    _install_fake_supervision_module()
+    _install_fake_config_module()
+    from collections import Counter, deque
+    from utils.vehicle_tracker import ClassHistory
+
+    rng = np.random.default_rng(0)
+    history = ClassHistory(window=6, capacity=2)
+    reference = {tid: deque(maxlen=6) for tid in range(5)}
+
+    # Few distinct classes and a short window make ties frequent, including after the window wraps
+    for _ in range(200):
+        tid = int(rng.integers(5))
+        class_id = int(rng.choice([2, 3, 5, 7]))
+        history.append(tid, class_id)
+        reference[tid].append(class_id)
+        assert history.majority(tid) == Counter(reference[tid]).most_common(1)[0]
+
+
+def _reference_update_class_consistency(class_history, stable_class, tracker_ids, class_ids, threshold):
+    """The original deque + Counter implementation of VehicleTracker.update_class_consistency"""
+    from collections import Counter
+    for i, track_id in enumerate(tracker_ids):
+        class_history[track_id].append(class_ids[i])
+        if track_id in stable_class:
+            class_ids[i] = stable_class[track_id]
+        elif len(class_history[track_id]) >= 3:
+            most_common_class, most_common_count = Counter(class_history[track_id]).most_common(1)[0]
+            if most_common_count / len(class_history[track_id]) >= threshold:
+                stable_class[track_id] = most_common_class
+                class_ids[i] = most_common_class
+
+
+def test_update_class_consistency_matches_counter_reference():
+    _install_fake_supervision_module()
+    _install_fake_config_module()
+    from collections import defaultdict, deque
+    import utils.vehicle_tracker as vehicle_tracker
+    from utils.vehicle_tracker import VehicleTracker
+
+    config = vehicle_tracker.Config
+    rng = np.random.default_rng(1)
+    vt = VehicleTracker()
+    ref_history = defaultdict(lambda: deque(maxlen=config.CLASS_HISTORY_FRAMES))
+    ref_stable = {}
+
+    for _ in range(60):
+        tracker_ids = rng.choice(40, size=int(rng.integers(1, 15)), replace=False)
+        # Each track mostly keeps one class with occasional flips, so some stabilise early and some late
+        n = len(tracker_ids)
+        class_ids = np.where(rng.random(n) < 0.7, 2 + tracker_ids % 3, rng.choice([2, 3, 5, 7], n))
+        detections = _FakeDetections(np.zeros((n, 4)), class_ids.copy(), np.ones(n), tracker_ids)
+        expected = class_ids.copy()
+
+        vt.update_class_consistency(detections)
+        _reference_update_class_consistency(ref_history, ref_stable, tracker_ids, expected, config.CLASS_CONFIDENCE_THRESHOLD)
+
+        np.testing.assert_array_equal(detections.class_id, expected)
+        assert vt.stable_class == ref_stable
+
+    assert 0 < len(ref_stable) < 40  # Both established and still-voting tracks were exercised
+
+
+def _random_boxes(rng, n):
+    """Clusters of jittered xyxy boxes (plenty of overlaps), plus some zero-area and touching boxes"""
+    centres = rng.uniform(0, 200, size=(max(1, n // 4), 2))[rng.integers(max(1, n // 4), size=n)]
+    centres = centres + rng.normal(0, 4, size=(n, 2))
+    sizes = rng.uniform(5, 40, size=(n, 2))
+    boxes = np.hstack([centres - sizes / 2, centres + sizes / 2])
+    boxes[::7, 2] = boxes[::7, 0]  # Zero width
+    if n > 3:
+        boxes[3] = [boxes[2, 2], boxes[2, 1], boxes[2, 2] + 10, boxes[2, 3]]  # Shares an edge with box 2
+    return boxes
+
+
+def test_iou_matrix_matches_calculate_iou_pairwise():
+    _install_fake_supervision_module()
+    _install_fake_config_module()
+    from utils.vehicle_tracker import VehicleTracker
+
+    rng = np.random.default_rng(2)
+    vt = VehicleTracker()
+    for n in (1, 2, 9, 40):
+        boxes = _random_boxes(rng, n)
+        iou = VehicleTracker.iou_matrix(boxes)
+        expected = np.array([[vt.calculate_iou(a, b) for b in boxes] for a in boxes])
+        np.testing.assert_allclose(iou, expected, rtol=1e-12, atol=1e-12)
+
+
+def _reference_merge(vt, boxes, classes, confidences, threshold):
+    """The original set-based greedy grouping with np.average merging"""
+    merged_indices, used_indices = [], set()
+    for i in range(len(boxes)):
+        if i in used_indices:
+            continue
+        current_group = [i]
+        used_indices.add(i)
+        for j in range(i + 1, len(boxes)):
+            if j not in used_indices and vt.calculate_iou(boxes[i], boxes[j]) > threshold:
+                current_group.append(j)
+                used_indices.add(j)
+        merged_indices.append(current_group)
+
+    merged_boxes, merged_classes, merged_confidences = [], [], []
+    for group in merged_indices:
+        group_confidences = confidences[group]
+        best_idx = np.argmax(group_confidences)
+        merged_boxes.append(np.average(boxes[group], axis=0, weights=group_confidences / np.sum(group_confidences)))
+        merged_classes.append(classes[group[best_idx]])
+        merged_confidences.append(group_confidences[best_idx])
+    return np.array(merged_boxes), np.array(merged_classes), np.array(merged_confidences)
+
+
+def test_merge_overlapping_detections_matches_reference():
+    _install_fake_supervision_module()
+    _install_fake_config_module()
+    import utils.vehicle_tracker as vehicle_tracker
+    from utils.vehicle_tracker import VehicleTracker
+
+    rng = np.random.default_rng(3)
+    vt = VehicleTracker()
+    merged_any = False
+    for n in (2, 5, 12, 30, 60):
+        boxes = _random_boxes(rng, n)
+        classes = rng.choice([2, 3, 5, 7], size=n)
+        confidences = rng.uniform(0.3, 1.0, size=n)
+
+        merged = vt.merge_overlapping_detections(_FakeDetections(boxes, classes, confidences))
+        exp_boxes, exp_classes, exp_confidences = _reference_merge(
+            vt, boxes, classes, confidences, vehicle_tracker.Config.DETECTION_OVERLAP_THRESHOLD
+        )
+
+        assert len(merged) == len(exp_boxes)
+        np.testing.assert_allclose(merged.xyxy, exp_boxes, rtol=1e-12)
+        np.testing.assert_array_equal(merged.class_id, exp_classes)
+        np.testing.assert_array_equal(merged.confidence, exp_confidences)
+        merged_any |= len(merged) < n
+
+    assert merged_any
+
+
+def test_iou_matrix_numba_kernel_matches_numpy_path():
+    _install_fake_supervision_module()
+    _install_fake_config_module()
+    import utils.vehicle_tracker as vehicle_tracker
+
+    rng = np.random.default_rng(4)
+    for n in (1, 3, 17, 80):
+        boxes = _random_boxes(rng, n)
+        boxes[::11, 3] = boxes[::11, 1] - 3  # Inverted (negative height) boxes as well
+        np.testing.assert_allclose(
+            vehicle_tracker._iou_matrix(boxes), vehicle_tracker._iou_matrix_numpy(boxes), rtol=1e-12, atol=1e-12
+        )
@@ -113,3 +113,30 @@ class AnnotationManager:
     def point_inside_polygon(point, polygon):
         """Check if point is inside polygon"""
         return cv2.pointPolygonTest(polygon.astype(np.float32), tuple(map(float, point)), False) >= 0
+    
+    @staticmethod
+    def polygon_edges(polygon):
+        """Precompute float32 (x0, y0, x1, y1) edge arrays of a polygon for points_inside_polygon"""
+        vertices = np.asarray(polygon, dtype=np.float32).reshape(-1, 2)
+        x1, y1 = vertices[:, 0], vertices[:, 1]
+        # Edge i runs from vertex i-1 to vertex i, the order cv2.pointPolygonTest walks the contour in
+        return np.roll(x1, 1), np.roll(y1, 1), x1, y1
+    
+    @staticmethod
+    def points_inside_polygon(points, polygon=None, edges=None):
+        """Check which of an (N, 2) array of points are inside or on polygon (vectorized cv2.pointPolygonTest(...) >= 0)"""
+        x0, y0, x1, y1 = edges if edges is not None else AnnotationManager.polygon_edges(polygon)
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        x, y = points[:, 0:1], points[:, 1:2]
+        
+        # Same float32 differences and float64 cross products as OpenCV, so boundary points match exactly
+        skip = ((y0 <= y) & (y1 <= y)) | ((y0 > y) & (y1 > y)) | ((x0 < x) & (x1 < x))
+        on_skipped_edge = skip & (y == y1) & (
+            (x == x1) | ((y == y0) & (((x0 <= x) & (x <= x1)) | ((x1 <= x) & (x <= x0))))
+        )
+        dist = (y - y0).astype(np.float64) * (x1 - x0) - (x - x0).astype(np.float64) * (y1 - y0)
+        dist = np.where(y1 < y0, -dist, dist)
+        
+        on_boundary = np.any(on_skipped_edge | (~skip & (dist == 0)), axis=1)
+        crossings = np.count_nonzero(~skip & (dist > 0), axis=1)
+        return on_boundary | (crossings % 2 == 1)
@@ -1,89 +1,156 @@
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import httpx
+from postgrest.exceptions import APIError
 from config.config import Config
 from clients.supabase_client import supabase_manager
 
+class TrackerIdUnavailableError(RuntimeError):
+    """Raised when the highest tracker_id was never read from the database, so no tracker ids can be allocated"""
+
 class DataManager:
     """Handles all data operations for Supabase database in SynerX with video-based schema"""
     
+    # Shared pool for blocking database/network I/O (per-record fallbacks, final saves, weather refresh)
+    IO_THREAD_PREFIX = "db-io"
+    _io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix=IO_THREAD_PREFIX)
+    
+    # Highest tracker_id lookup: per-call timeout, cold-start retries, last good value and warning rate limit
+    TRACKER_ID_TIMEOUT = 2.0
+    TRACKER_ID_COLD_START_ATTEMPTS = 4
+    TRACKER_ID_RETRY_DELAY = 0.5  # Doubled after each failed cold-start attempt
+    TRACKER_ID_WARNING_INTERVAL = 60.0
+    _last_highest_id = None
+    _last_tracker_id_warning = 0.0
+    
+    # In-process tracker_id counter: re-seeded from the database at the start of each video, advanced locally
+    _tracker_id_lock = threading.Lock()
+    _next_tracker_id = None
+    _sequence_initialized = False
+    
+    @staticmethod
+    def submit_io(fn, *args):
+        """Run fn(*args) on the shared I/O pool and return its future"""
+        return DataManager._io_pool.submit(fn, *args)
+    
+    @staticmethod
+    def _on_io_thread():
+        """True when running on a shared I/O pool worker (which must not wait on another pool task)"""
+        return threading.current_thread().name.startswith(DataManager.IO_THREAD_PREFIX)
+    
     @staticmethod
     def initialize_csv_files():
         """Initialize method kept for compatibility but no longer creates CSV files"""
         print("[INFO] CSV initialization disabled - using database only")
-        pass
     
     @staticmethod
     def initialize_tracker_sequence():
-        """Initialize the tracker_id sequence to continue from the highest existing tracker_id"""
-        try:
-            # Get the highest tracker_id from database
-            result = supabase_manager.client.table("tracking_results") \
-                .select("tracker_id") \
-                .order("tracker_id", desc=True) \
-                .limit(1) \
-                .execute()
+        """Initialize the tracker_id sequence to continue from the highest existing tracker_id (once per process)"""
+        # Get the highest tracker_id from database (falls back to the last known value, raises if there is none)
+        highest_id = DataManager.get_highest_tracker_id()
+        DataManager._seed_tracker_counter(highest_id)
+        
+        if DataManager._sequence_initialized:
+            return highest_id
+        
+        if highest_id > 0:
+            # Try to set the sequence using direct SQL
+            try:
+                # Use a custom RPC function to set the sequence
+                supabase_manager.client.rpc('set_tracker_id_sequence', {'value': highest_id}).execute()
+                DataManager._sequence_initialized = True
+                print(f"[DEBUG] initialize_tracker_sequence: Set sequence to continue from {highest_id}")
+            except (APIError, httpx.HTTPError) as e:
+                # If RPC fails, the in-process counter is used instead
+                print(f"[DEBUG] initialize_tracker_sequence: RPC failed ({e}), will use fallback method. Highest ID: {highest_id}")
             
-            if result.data and len(result.data) > 0:
-                highest_id = result.data[0]['tracker_id']
-                
-                # Try to set the sequence using direct SQL
-                try:
-                    # Use a custom RPC function to set the sequence
-                    sequence_result = supabase_manager.client.rpc('setval', {
-                        'sequence_name': 'tracker_id_seq',
-                        'value': highest_id
-                    }).execute()
-                    print(f"[DEBUG] initialize_tracker_sequence: Set sequence to continue from {highest_id}")
-                except:
-                    # If RPC fails, we'll use the fallback method
-                    print(f"[DEBUG] initialize_tracker_sequence: RPC failed, will use fallback method. Highest ID: {highest_id}")
-                
-                return highest_id
-            else:
-                print("[DEBUG] initialize_tracker_sequence: No existing data")
-                return 0
-                
-        except Exception as e:
-            print(f"[WARNING] Failed to initialize tracker sequence: {e}")
+            return highest_id
+        else:
+            print("[DEBUG] initialize_tracker_sequence: No existing data")
             return 0
     
     @staticmethod
-    def get_next_tracker_id():
-        """Get the next available tracker_id - robust approach that always works"""
-        try:
-            # Get the highest tracker_id from database
-            highest_id = DataManager.get_highest_tracker_id()
-            next_id = highest_id + 1
-            
-            print(f"[DEBUG] get_next_tracker_id: Highest existing: {highest_id}, Next will be: {next_id}")
-            return next_id
-                
-        except Exception as e:
-            print(f"[WARNING] Failed to get next tracker_id: {e}")
-            return 1
+    def get_next_tracker_id(refresh: bool = False):
+        """Get the next available tracker_id - from memory once seeded, from the database on cold start or refresh"""
+        if not refresh:
+            with DataManager._tracker_id_lock:
+                next_id = DataManager._next_tracker_id
+            if next_id is not None:
+                return next_id
+        
+        # Other workers and processes write tracking_results too, so a refresh takes the higher of the database
+        # and the local counter. A cold start that still fails after its retries propagates, since guessing would
+        # restart numbering over existing rows
+        highest_id = DataManager.get_highest_tracker_id()
+        DataManager._seed_tracker_counter(highest_id)
+        with DataManager._tracker_id_lock:
+            next_id = DataManager._next_tracker_id
+        
+        print(f"[DEBUG] get_next_tracker_id: Highest existing: {highest_id}, Next will be: {next_id}")
+        return next_id
+    
+    @staticmethod
+    def _seed_tracker_counter(highest_id):
+        """Seed the in-process counter, but only from a value actually read from the database"""
+        if DataManager._last_highest_id is None:
+            return
+        with DataManager._tracker_id_lock:
+            if DataManager._next_tracker_id is None or highest_id >= DataManager._next_tracker_id:
+                DataManager._next_tracker_id = highest_id + 1
+    
+    @staticmethod
+    def advance_tracker_id(used_id):
+        """Move the in-process counter past a tracker_id that has been written"""
+        with DataManager._tracker_id_lock:
+            if DataManager._next_tracker_id is not None and used_id >= DataManager._next_tracker_id:
+                DataManager._next_tracker_id = int(used_id) + 1
+    
+    @staticmethod
+    def _lookup_highest_tracker_id():
+        """Read the highest tracker_id once, bounded by TRACKER_ID_TIMEOUT when called off the I/O pool"""
+        # Scalar MAX(tracker_id) computed server-side, or ORDER BY ... LIMIT 1 where the RPC is not deployed
+        if DataManager._on_io_thread():
+            # Already on a pool worker (e.g. startup's setup_tracker_offset): queueing behind the other
+            # workers could run out the timeout, so run the bounded-retry lookup here
+            return supabase_manager.get_max_tracker_id()
+        return DataManager._io_pool.submit(supabase_manager.get_max_tracker_id).result(
+            timeout=DataManager.TRACKER_ID_TIMEOUT
+        )
     
     @staticmethod
     def get_highest_tracker_id():
-        """Get only the highest tracker_id from database - much more efficient than loading all data"""
-        try:
-            # Get the highest tracker_id from database
-            result = supabase_manager.client.table("tracking_results") \
-                .select("tracker_id") \
-                .order("tracker_id", desc=True) \
-                .limit(1) \
-                .execute()
-            
-            if result.data and len(result.data) > 0:
-                highest_id = result.data[0]['tracker_id']
-                print(f"[DEBUG] get_highest_tracker_id: Found highest tracker_id: {highest_id}")
+        """Get only the highest tracker_id from database - falls back to the last value read, retries then raises before any succeeded"""
+        cold_start = DataManager._last_highest_id is None
+        attempts = DataManager.TRACKER_ID_COLD_START_ATTEMPTS if cold_start else 1
+        for attempt in range(attempts):
+            try:
+                highest_id = DataManager._lookup_highest_tracker_id()
+                DataManager._last_highest_id = highest_id
                 return highest_id
-            else:
-                print("[DEBUG] get_highest_tracker_id: No existing tracker_ids found")
-                return 0
-                
-        except Exception as e:
-            print(f"[WARNING] Failed to get highest tracker_id from database: {e}")
-            return 0
+            except Exception as e:
+                error = e
+                if attempt + 1 < attempts:
+                    delay = DataManager.TRACKER_ID_RETRY_DELAY * (2 ** attempt)
+                    print(f"[WARNING] Failed to get highest tracker_id from database ({e!r}), retrying in {delay:.1f}s ({attempt + 1}/{attempts - 1})")
+                    time.sleep(delay)
+        
+        # Returning 0 would restart numbering over existing tracker_ids, so never guess without a known value
+        if cold_start:
+            print(f"[ERROR] Failed to get highest tracker_id from database after {attempts} attempts ({error!r}) and no previous value is known")
+            raise TrackerIdUnavailableError(
+                f"Could not read the highest tracker_id from the database after {attempts} attempts ({error!r}); "
+                "refusing to allocate tracker ids that could overwrite existing tracking results"
+            ) from error
+        
+        fallback = DataManager._last_highest_id
+        now = time.monotonic()
+        if now - DataManager._last_tracker_id_warning >= DataManager.TRACKER_ID_WARNING_INTERVAL:
+            DataManager._last_tracker_id_warning = now
+            print(f"[WARNING] Failed to get highest tracker_id from database ({error!r}), using last known value {fallback}")
+        return fallback
     
     @staticmethod
     def read_existing_data(video_id: int = None):
@@ -91,28 +158,32 @@ class DataManager:
         try:
             data = {}
             
-            # Read from database with optional video_id filter
-            db_data = supabase_manager.get_tracking_data(limit=1000, video_id=video_id)
-            
-            for row in db_data:
-                if row.get('tracker_id'):
-                    tracker_id_str = str(row['tracker_id'])
-                    data[tracker_id_str] = {
-                        "tracker_id": int(row['tracker_id']),
-                        "video_id": row.get('video_id'),
-                        "vehicle_type": row.get('vehicle_type', 'unknown'),
-                        "status": row.get('status', 'moving'),
-                        "compliance": int(row.get('compliance', 0)),
-                        "reaction_time": float(row.get('reaction_time')) if row.get('reaction_time') else None,
-                        "weather_condition": row.get('weather_condition'),
-                        "temperature": float(row.get('temperature')) if row.get('temperature') else None,
-                        "humidity": int(row.get('humidity')) if row.get('humidity') else None,
-                        "visibility": float(row.get('visibility')) if row.get('visibility') else None,
-                        "precipitation_type": row.get('precipitation_type'),
-                        "wind_speed": float(row.get('wind_speed')) if row.get('wind_speed') else None,
-                        "date": row.get('date', '')
-                    }
-                    print(f"[DEBUG] Loaded from DB: track_id={row['tracker_id']}, video_id={row.get('video_id')}, type={row.get('vehicle_type')}, status={row.get('status')}")
+            # Page through every matching row (narrow select) instead of stopping at the newest 1000
+            for row in supabase_manager.iter_tracking_data(video_id=video_id):
+                tracker_id = row.get('tracker_id')
+                if not tracker_id:
+                    continue
+                reaction_time = row.get('reaction_time')
+                temperature = row.get('temperature')
+                humidity = row.get('humidity')
+                visibility = row.get('visibility')
+                wind_speed = row.get('wind_speed')
+                tracker_id = int(tracker_id)
+                data[tracker_id] = {
+                    "tracker_id": tracker_id,
+                    "video_id": row.get('video_id'),
+                    "vehicle_type": row.get('vehicle_type') or 'unknown',
+                    "status": row.get('status') or 'moving',
+                    "compliance": int(row.get('compliance') or 0),
+                    "reaction_time": float(reaction_time) if reaction_time else None,
+                    "weather_condition": row.get('weather_condition'),
+                    "temperature": float(temperature) if temperature else None,
+                    "humidity": int(humidity) if humidity else None,
+                    "visibility": float(visibility) if visibility else None,
+                    "precipitation_type": row.get('precipitation_type'),
+                    "wind_speed": float(wind_speed) if wind_speed else None,
+                    "date": row.get('date') or ''
+                }
             
             print(f"[DEBUG] read_existing_data: Returning {len(data)} records from database")
             return data
@@ -134,7 +205,8 @@ class DataManager:
                 try:
                     if not row.get('date') or not row.get('vehicle_type') or not row.get('count'):
                         continue
-                    date_key = row['date'].split(' ')[0] if ' ' in row['date'] else row['date'].split('T')[0]
+                    # Dates are 'YYYY-MM-DD HH:MM:SS' or ISO 'YYYY-MM-DDTHH:MM:SS'; the day is always the first 10 chars
+                    date_key = row['date'][:10]
                     vehicle_type = row['vehicle_type']
                     if date_key not in count_data:
                         count_data[date_key] = {}
@@ -142,7 +214,7 @@ class DataManager:
                 except (ValueError, KeyError, AttributeError) as e:
                     continue
             
-            print(f"[DEBUG] read_existing_count_data: Loaded from database: {count_data}")
+            print(f"[DEBUG] read_existing_count_data: Loaded counts for {len(count_data)} dates from database")
             return count_data
                 
         except Exception as e:
@@ -152,7 +224,7 @@ class DataManager:
     @staticmethod
     def update_files(history_dict, vehicle_counter, mode="api", video_id: int = None):
         """Update data - save to database only with video_id link"""
-        tracking_success = DataManager.update_tracking_file(history_dict, mode, video_id)
+        tracking_success = DataManager.update_tracking_file(history_dict, mode, video_id=video_id)
         count_success = DataManager.update_count_file(vehicle_counter, mode, video_id)
         return tracking_success and count_success
     
@@ -160,24 +232,26 @@ class DataManager:
     def update_tracking_file(history_dict, mode="api", changed_records=None, video_id: int = None):
         """Update tracking results - save to database only with video_id link"""
         try:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
             if history_dict:
-                # Convert to list for batch save
-                all_records = []
-                for tid, data in history_dict.items():
-                    data_with_date = data.copy()
-                    data_with_date.setdefault("date", current_time)
-                    all_records.append(data_with_date)
+                all_records = list(history_dict.values())
+                total = len(all_records)
+                failed = 0
                 
-                # Save all records in one batch operation with video_id
-                success = supabase_manager.save_tracking_data_batch(all_records, video_id)
-                if success:
-                    print(f"✅ {len(all_records)} tracking records saved to database in batch for video {video_id}")
+                if not supabase_manager.save_tracking_data_columnar(all_records, video_id):
+                    # Fallback: save records individually with several requests in flight
+                    print(f"[WARNING] Batch save failed, retrying {total} tracking records individually")
+                    results = DataManager._io_pool.map(
+                        lambda record: supabase_manager.save_tracking_data(record, video_id), all_records
+                    )
+                    failed = sum(1 for ok in results if not ok)
+                
+                DataManager.advance_tracker_id(max(int(data["tracker_id"]) for data in all_records))
+                
+                if failed == 0:
+                    print(f"✅ {total} tracking records saved to database in batch for video {video_id}")
                     return True
-                else:
-                    print(f"❌ Failed to save {len(all_records)} tracking records to database")
-                    return False
+                print(f"❌ Failed to save {failed} of {total} tracking records to database")
+                return False
             else:
                 print("[INFO] No tracking records to save")
                 return True
@@ -191,25 +265,16 @@ class DataManager:
         """Update vehicle count data - save to database only with video_id link"""
         try:
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            current_date = current_time.split(' ')[0]
+            current_date = current_time[:10]
             
             if vehicle_counter:
-                # Convert to list for batch save
-                vehicle_count_records = []
-                for vehicle_type, count in vehicle_counter.items():
-                    vehicle_count_records.append({
-                        "vehicle_type": vehicle_type,
-                        "count": count,
-                        "date": current_date
-                    })
-                
-                # Save all vehicle counts in one batch operation with video_id
-                success = supabase_manager.save_vehicle_count_batch(vehicle_count_records, video_id)
+                # Save all vehicle counts in one upsert statement with video_id
+                success = supabase_manager.save_vehicle_counts_rpc(vehicle_counter, current_date, video_id)
                 if success:
-                    print(f"✅ {len(vehicle_count_records)} vehicle counts saved to database in batch for video {video_id}")
+                    print(f"✅ {len(vehicle_counter)} vehicle counts saved to database in batch for video {video_id}")
                     return True
                 else:
-                    print(f"❌ Failed to save {len(vehicle_count_records)} vehicle counts to database")
+                    print(f"❌ Failed to save {len(vehicle_counter)} vehicle counts to database")
                     return False
             else:
                 print("[INFO] No vehicle counts to save")
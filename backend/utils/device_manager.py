@@ -1,38 +1,43 @@
 import torch
+from functools import lru_cache
+
+@lru_cache(maxsize=1)
+def _cuda_available():
+    """CUDA availability does not change during the process, so query it once"""
+    return torch.cuda.is_available()
 
 class DeviceManager:
     """Manages device selection and GPU operations"""
     
     @staticmethod
+    @lru_cache(maxsize=1)
     def get_device():
         """Get the best available device (CUDA GPU or CPU)"""
-        if torch.cuda.is_available():
+        if _cuda_available():
             return "cuda"
         return "cpu"
     
     @staticmethod
+    @lru_cache(maxsize=1)
     def get_gpu_info():
         """Get GPU information if available"""
-        if torch.cuda.is_available():
+        if _cuda_available():
             gpu_name = torch.cuda.get_device_name(0)
             return f"CUDA GPU: {gpu_name}"
         return "CPU (CUDA not available)"
     
     @staticmethod
     def clear_gpu_memory():
-        """Clear GPU memory if using CUDA with optimization"""
-        if torch.cuda.is_available():
+        """Release cached GPU memory if using CUDA (cheap and safe to call repeatedly; full GC is left to OOM recovery)"""
+        if _cuda_available():
             torch.cuda.empty_cache()
-            # Force garbage collection for better memory management
-            import gc
-            gc.collect()
             return True
         return False
     
     @staticmethod
     def get_memory_info():
         """Get GPU memory information if available"""
-        if torch.cuda.is_available():
+        if _cuda_available():
             allocated = torch.cuda.memory_allocated() / 1024**3  # GB
             cached = torch.cuda.memory_reserved() / 1024**3  # GB
             return f"GPU Memory: {allocated:.2f}GB allocated, {cached:.2f}GB cached"
@@ -44,7 +49,7 @@ class DeviceManager:
         try:
             return func(*args, **kwargs)
         except RuntimeError as e:
-            if "out of memory" in str(e).lower() and torch.cuda.is_available():
+            if "out of memory" in str(e).lower() and _cuda_available():
                 print(f"[WARNING] GPU out of memory. Clearing cache and retrying...")
                 print(f"[INFO] {DeviceManager.get_memory_info()}")
                 torch.cuda.empty_cache()
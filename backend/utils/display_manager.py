@@ -1,11 +1,11 @@
+import os
 import time
+import numpy as np
 from config.config import Config
-from utils.video_streamer import video_streamer
 
 # Conditional OpenCV import with headless mode
 try:
     import cv2
-    import os
     # Set OpenCV to headless mode to avoid GUI issues
     os.environ['OPENCV_VIDEOIO_PRIORITY_MSMF'] = '0'
     os.environ['OPENCV_VIDEOIO_PRIORITY_DSHOW'] = '0'
@@ -15,6 +15,17 @@ try:
 except ImportError:
     HAS_CV2 = False
 
+# Web streaming is optional - display keeps working without it
+try:
+    from utils.video_streamer import video_streamer
+    HAS_STREAMER = True
+except ImportError:
+    video_streamer = None
+    HAS_STREAMER = False
+
+# Keyboard controls for the local display window
+_KEY_Q, _KEY_P, _KEY_S, _KEY_H = ord('q'), ord('p'), ord('s'), ord('h')
+
 class DisplayManager:
     """Manages video display and streaming to web clients"""
     
@@ -22,11 +33,15 @@ class DisplayManager:
         self.fps_start_time = time.time()
         self.fps_prev_time = self.fps_start_time
         self.streaming_active = False
+        # Display resize output buffer, reused while the input frame shape stays the same
+        self._resize_src_shape = None
+        self._resize_buf = None
         
     def handle_display(self, frame, frame_idx):
         """Handle frame display and streaming"""
         # Update video streamer with current frame
-        video_streamer.update_frame(frame)
+        if HAS_STREAMER:
+            video_streamer.update_frame(frame)
         
         # Handle local display if enabled
         if Config.ENABLE_DISPLAY:
@@ -47,14 +62,19 @@ class DisplayManager:
             return True
             
         try:
-            # Resize frame for display if too large
-            display_frame = frame.copy()
-            height, width = display_frame.shape[:2]
+            # Resize frame for display if too large (resize allocates its own output; imshow does not modify the frame)
+            display_frame = frame
+            height, width = frame.shape[:2]
             if width > Config.MAX_DISPLAY_WIDTH:
-                scale = Config.MAX_DISPLAY_WIDTH / width
-                new_width = int(width * scale)
-                new_height = int(height * scale)
-                display_frame = cv2.resize(display_frame, (new_width, new_height))
+                if frame.shape != self._resize_src_shape:
+                    scale = Config.MAX_DISPLAY_WIDTH / width
+                    new_width = int(width * scale)
+                    new_height = int(height * scale)
+                    self._resize_buf = np.empty((new_height, new_width) + frame.shape[2:], dtype=frame.dtype)
+                    self._resize_src_shape = frame.shape
+                display_frame = cv2.resize(
+                    frame, self._resize_buf.shape[1::-1], dst=self._resize_buf, interpolation=cv2.INTER_AREA
+                )
             
             # Only use GUI functions if not on headless server
             cv2.imshow("Tracking with Stop", display_frame)
@@ -79,16 +99,16 @@ class DisplayManager:
         try:
             key = cv2.waitKey(Config.DISPLAY_WAIT_KEY_DELAY) & 0xFF
             
-            if key == ord('q'):
+            if key == _KEY_Q:
                 print("[INFO] 'q' pressed. Stopping gracefully...")
                 return False
-            elif key == ord('p'):
+            elif key == _KEY_P:
                 print("[INFO] 'p' pressed. Pausing... Press any key to continue...")
                 cv2.waitKey(0)
-            elif key == ord('s'):
+            elif key == _KEY_S:
                 print("[INFO] 's' pressed. Saving current frame...")
                 print("[INFO] Frame save requested (not implemented in display manager)")
-            elif key == ord('h'):
+            elif key == _KEY_H:
                 print("[INFO] 'h' pressed. Displaying help...")
                 print("Controls: q=quit, p=pause, s=save frame, h=help")
                 cv2.waitKey(2000)  # Show help for 2 seconds
@@ -107,17 +127,9 @@ class DisplayManager:
             self.fps_prev_time = now
             print(f"[INFO] FPS: {fps:.2f}")
     
-    def cleanup(self):
-        """Clean up OpenCV windows (headless-compatible)"""
-        if HAS_CV2:
-            try:
-                cv2.destroyAllWindows()
-            except Exception as e:
-                print(f"[DISPLAY] Cleanup warning (headless mode): {e}")
-    
     def start_streaming(self):
         """Start video streaming to web clients - only when clients connect"""
-        if not self.streaming_active:
+        if HAS_STREAMER and not self.streaming_active:
             video_streamer.start_streaming()
             self.streaming_active = True
             print("[INFO] Video streaming started for web clients")
@@ -130,7 +142,10 @@ class DisplayManager:
             print("[INFO] Video streaming stopped for web clients")
             
     def cleanup(self):
-        """Clean up display resources"""
-        if Config.ENABLE_DISPLAY:
-            cv2.destroyAllWindows()
+        """Clean up OpenCV windows and streaming (headless-compatible)"""
+        if HAS_CV2 and Config.ENABLE_DISPLAY:
+            try:
+                cv2.destroyAllWindows()
+            except Exception as e:
+                print(f"[DISPLAY] Cleanup warning (headless mode): {e}")
         self.stop_streaming()
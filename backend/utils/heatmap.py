@@ -1,33 +1,50 @@
 import cv2
 import numpy as np
 
+# 1D Gaussian (25 taps, sigma 7) shared by all generators; applied separably along x and y
+KERNEL_SIZE = 25
+_GAUSSIAN_1D = cv2.getGaussianKernel(KERNEL_SIZE, 7).astype(np.float32)
+_GAUSSIAN_1D.flags.writeable = False
+
 class HeatMapGenerator:
     """Handles heat map generation"""
     
     def __init__(self, resolution_wh):
         self.W, self.H = resolution_wh
-        self.heat_raw = np.zeros((self.H, self.W), dtype=np.float32)
-        self.KERNEL = cv2.getGaussianKernel(25, 7)
-        self.KERNEL = (self.KERNEL @ self.KERNEL.T).astype(np.float32)
-        self.kH, self.kW = self.KERNEL.shape
+        # Detection centres are accumulated as weighted points on a raster padded by the kernel radius,
+        # so centres just outside the frame still spread into it; the Gaussian is applied once at save time
+        self.pad = KERNEL_SIZE // 2
+        self.heat_points = np.zeros((self.H + 2 * self.pad, self.W + 2 * self.pad), dtype=np.float32)
     
     def accumulate(self, detections):
         """Accumulate detection data for heat map"""
-        for (x1, y1, x2, y2), conf in zip(detections.xyxy, detections.confidence):
-            cx, cy = int((x1 + x2) / 2), int((y1 + y2) / 2)
-            
-            x0, x1p = max(0, cx - self.kW // 2), min(self.W, cx + self.kW // 2 + 1)
-            y0, y1p = max(0, cy - self.kH // 2), min(self.H, cy + self.kH // 2 + 1)
-            
-            kx0, ky0 = x0 - (cx - self.kW // 2), y0 - (cy - self.kH // 2)
-            kx1, ky1 = kx0 + (x1p - x0), ky0 + (y1p - y0)
-
-            self.heat_raw[y0:y1p, x0:x1p] += self.KERNEL[ky0:ky1, kx0:kx1] * conf
+        xyxy = detections.xyxy
+        if len(xyxy) == 0:
+            return
+        
+        cx = ((xyxy[:, 0] + xyxy[:, 2]) / 2).astype(np.int64) + self.pad
+        cy = ((xyxy[:, 1] + xyxy[:, 3]) / 2).astype(np.int64) + self.pad
+        inside = (cx >= 0) & (cx < self.heat_points.shape[1]) & (cy >= 0) & (cy < self.heat_points.shape[0])
+        
+        np.add.at(self.heat_points, (cy[inside], cx[inside]), detections.confidence[inside])
+    
+    def heat_density(self):
+        """Blur the accumulated points with the Gaussian kernel and crop back to the frame"""
+        blurred = cv2.sepFilter2D(
+            self.heat_points, -1, _GAUSSIAN_1D, _GAUSSIAN_1D, borderType=cv2.BORDER_CONSTANT
+        )
+        return blurred[self.pad:self.pad + self.H, self.pad:self.pad + self.W]
     
     def save_heat_maps(self, first_frame=None):
         """Save heat map images"""
-        heat_norm = cv2.normalize(self.heat_raw, None, 0, 255, cv2.NORM_MINMAX)
-        heat_color = cv2.applyColorMap(heat_norm.astype(np.uint8), cv2.COLORMAP_JET)
+        heat_raw = self.heat_density()
+        
+        # Min/max in one pass, then scale straight to uint8 without the float temp. convertScaleAbs rounds where
+        # NORM_MINMAX + astype(uint8) truncated, so pixels can be up to 1 level higher than before
+        min_val, max_val, _, _ = cv2.minMaxLoc(heat_raw)
+        scale = 255.0 / (max_val - min_val) if max_val > min_val else 0.0
+        heat_norm = cv2.convertScaleAbs(heat_raw, alpha=scale, beta=-min_val * scale)
+        heat_color = cv2.applyColorMap(heat_norm, cv2.COLORMAP_JET)
         cv2.imwrite("./asset/heatmap.png", heat_color)
         
         if first_frame is not None and first_frame.size:
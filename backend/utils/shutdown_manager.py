@@ -4,23 +4,19 @@ class ShutdownManager:
     """Simple shutdown manager for video processing"""
     
     def __init__(self):
-        self.shutdown_requested = False
-        self.shutdown_lock = threading.Lock()
+        self._shutdown_event = threading.Event()
     
     def check_shutdown(self):
         """Check if shutdown has been requested"""
-        with self.shutdown_lock:
-            return self.shutdown_requested
+        return self._shutdown_event.is_set()
     
     def set_shutdown_flag(self):
         """Set the shutdown flag"""
-        with self.shutdown_lock:
-            self.shutdown_requested = True
+        self._shutdown_event.set()
     
     def reset_shutdown_flag(self):
         """Reset the shutdown flag"""
-        with self.shutdown_lock:
-            self.shutdown_requested = False
+        self._shutdown_event.clear()
 
 # Global instance
 shutdown_manager = ShutdownManager()
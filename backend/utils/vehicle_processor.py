@@ -1,14 +1,61 @@
+import sys
+import threading
 import time
 import numpy as np
 from datetime import datetime
 from collections import Counter
+from functools import lru_cache
 from config.config import Config
 from utils.annotation_manager import AnnotationManager
 from utils.weather_manager import weather_manager
 
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Per-vehicle event logging is off unless explicitly enabled; printing on every detection stalls the frame loop
+DEBUG_LOGS = Config.ENABLE_DEBUG_LOGS
+
+@lru_cache(maxsize=8)
+def _velocity_weights(count):
+    """Linear 1..2 weights favouring recent displacements (history length is fixed, so this is reused)"""
+    weights = np.linspace(1, 2, count)
+    return weights, weights.sum()
+
+def _weighted_velocities_numpy(windows, weights, weight_sum):
+    """Weighted average step length of each (window, 2) position history"""
+    steps = np.diff(windows.astype(np.float64), axis=1)
+    displacements = np.sqrt(np.einsum('kij,kij->ki', steps, steps))
+    return displacements @ weights / weight_sum
+
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def _weighted_velocities(windows, weights, weight_sum):
+        """Weighted average step length of each (window, 2) position history, as one fused loop"""
+        velocities = np.empty(windows.shape[0])
+        for k in range(windows.shape[0]):
+            total = 0.0
+            for i in range(1, windows.shape[1]):
+                dx = windows[k, i, 0] - windows[k, i - 1, 0]
+                dy = windows[k, i, 1] - windows[k, i - 1, 1]
+                total += np.sqrt(dx * dx + dy * dy) * weights[i - 1]
+            velocities[k] = total / weight_sum
+        return velocities
+    
+    # Compile for the float32 slab layout now so the first stationary check doesn't pay the JIT cost
+    _weighted_velocities(np.zeros((1, 2, 2), dtype=np.float32), np.ones(1), 1.0)
+else:
+    _weighted_velocities = _weighted_velocities_numpy
+
 class VehicleProcessor:
     """Handles vehicle detection processing and tracking logic with video-based schema"""
     
+    SESSION_QUERY_CHUNK_SIZE = 500  # tracker_ids per in_() filter, keeps the request URL bounded
+    WEATHER_REFRESH_FRACTION = 0.8  # Refresh cached weather in the background after this fraction of its TTL
+    TRACK_EVICTION_INTERVAL = 30  # Frames between sweeps for tracks unseen for Config.TRACK_STATE_TTL_FRAMES
+    
     def __init__(self, vehicle_tracker, data_manager, mode, video_id: int = None):
         self.vehicle_tracker = vehicle_tracker
         self.data_manager = data_manager
@@ -22,6 +69,28 @@ class VehicleProcessor:
         self.tracker_types = {}
         self.stop_zone_history_dict = {}
         self.tracker_id_offset = 0
+        self._timestamp_second = None
+        self._timestamp_str = None
+        self._frame_time = None
+        self._frame_index = 0
+        self._last_seen = {}  # track_id -> frame index it was last detected in
+        self._frame_time_str = None
+        self._weather_for_frame = None
+        self._new_vehicle_ids, self._new_vehicle_types = [], []
+        self._weather_cache = None
+        self._weather_cache_time = None
+        self._weather_lock = threading.Lock()
+        self._weather_refreshing = False
+        # Weather location is fixed for the process; resolve it once
+        self._lat = getattr(Config, 'LOCATION_LAT', -37.740585)  # Melbourne coordinates
+        self._lon = getattr(Config, 'LOCATION_LON', 144.731637)  # Melbourne coordinates
+        # Stop zone is fixed for the run; its edge arrays are built once for the per-frame zone test
+        self._stop_zone_edges = AnnotationManager.polygon_edges(Config.STOP_ZONE_POLYGON)
+        # Class id -> vehicle type lookup table, indexed directly by the (small, dense) YOLO class ids;
+        # names are interned so counter and record keys compare by identity
+        self._class_lut = np.array(
+            [sys.intern(Config.CLASS_NAMES.get(i, "unknown")) for i in range(max(Config.CLASS_NAMES) + 1)], dtype=object
+        )
         
     def initialize_data(self):
         """Initialize tracking data - always use database mode with video_id"""
@@ -30,8 +99,9 @@ class VehicleProcessor:
         print(f"[INFO] Using database for data storage with video_id: {self.video_id}")
         
         # Initialize weather cache
-        self._weather_cache = None
-        self._weather_cache_time = None
+        with self._weather_lock:
+            self._weather_cache = None
+            self._weather_cache_time = None
     
     def load_existing_counts(self):
         """Load existing vehicle counts from database for specific video"""
@@ -45,9 +115,9 @@ class VehicleProcessor:
             db_vehicle_counts = supabase_manager.get_vehicle_counts(limit=1000, video_id=self.video_id)
             for row in db_vehicle_counts:
                 if row.get('date') and row.get('vehicle_type') and row.get('count'):
-                    row_date = row['date'].split(' ')[0] if ' ' in row['date'] else row['date'].split('T')[0]
+                    row_date = row['date'][:10]  # "YYYY-MM-DD" prefix of both "T" and space separated timestamps
                     if row_date == current_date:
-                        vehicle_type = row['vehicle_type']
+                        vehicle_type = sys.intern(row['vehicle_type'])
                         count = int(row['count'])
                         self.vehicle_type_counter[vehicle_type] = count
             print(f"[INFO] Loaded counts from database for video {self.video_id}: {dict(self.vehicle_type_counter)}")
@@ -56,7 +126,8 @@ class VehicleProcessor:
     
     def setup_tracker_offset(self):
         """Setup tracker ID offset for continuation from database"""
-        next_tracker_id = self.data_manager.get_next_tracker_id()
+        # Re-read the database for every video: another upload or worker may have written tracker ids since
+        next_tracker_id = self.data_manager.get_next_tracker_id(refresh=True)
         self.tracker_id_offset = next_tracker_id - 1
         if next_tracker_id > 1:
             print(f"[INFO] Continuing from tracker ID: {next_tracker_id}")
@@ -65,32 +136,58 @@ class VehicleProcessor:
     
     def process_detections(self, detections, anchor_pts, transformed_pts):
         """Process vehicle detections and update tracking data"""
+        if detections.tracker_id is None or len(detections.tracker_id) == 0:
+            self._mark_seen(())  # Empty frames still age out absent tracks
+            return [], []
+        
         top_labels, bottom_labels = [], []
+        self._frame_time = time.time()  # One clock read per frame for entry and reaction times
+        self._frame_time_str = self._frame_timestamp(self._frame_time)
+        self._weather_for_frame = None  # Resolved on the first record update of this frame
+        self._new_vehicle_ids, self._new_vehicle_types = [], []  # Folded into the counters after the loop
+        
+        # Stop-zone membership for every detection in one vectorized pass
+        in_zone_mask = AnnotationManager.points_inside_polygon(anchor_pts, edges=self._stop_zone_edges)
+        
+        # Positions are only kept while a vehicle is inside the zone
+        position_history = self.vehicle_tracker.position_history
+        for track_id, trans_pt, in_zone in zip(detections.tracker_id, transformed_pts, in_zone_mask):
+            if in_zone:
+                position_history.append(track_id, trans_pt)
+            else:
+                position_history.clear(track_id)
         
-        for track_id, orig_pt, trans_pt, class_id in zip(
-            detections.tracker_id, anchor_pts, transformed_pts, detections.class_id
+        # Stationarity for every in-zone vehicle in one vectorized pass
+        stationary_ids = self._stationary_track_ids(np.asarray(detections.tracker_id)[in_zone_mask])
+        
+        # Bind per-frame lookups once for the detection loop
+        vehicle_tracker = self.vehicle_tracker
+        status_cache = vehicle_tracker.status_cache
+        entry_times = vehicle_tracker.entry_times
+        reaction_times = vehicle_tracker.reaction_times
+        stationary_vehicles = vehicle_tracker.stationary_vehicles
+        tracker_types = self.tracker_types
+        
+        for track_id, vehicle_type, in_zone in zip(
+            detections.tracker_id, self._vehicle_types(detections.class_id), in_zone_mask
         ):
-            vehicle_type = Config.CLASS_NAMES.get(class_id, "unknown")
-            self.tracker_types[track_id] = vehicle_type
+            tracker_types[track_id] = vehicle_type
             
-            previous_status = self.vehicle_tracker.status_cache.get(track_id, "")
+            previous_status = status_cache.get(track_id, "")
             current_status = "moving"
             compliance = 0
             
-            self.vehicle_tracker.position_history[track_id].append(trans_pt)
-            
             # Process stop zone logic
-            if AnnotationManager.point_inside_polygon(orig_pt, Config.STOP_ZONE_POLYGON):
+            if in_zone:
                 current_status, compliance = self._process_stop_zone_vehicle(
-                    track_id, vehicle_type, trans_pt, current_status, compliance
+                    track_id, vehicle_type, track_id in stationary_ids, current_status, compliance
                 )
             else:
-                self.vehicle_tracker.position_history[track_id].clear()
-                if track_id in self.vehicle_tracker.entry_times and track_id not in self.vehicle_tracker.reaction_times:
-                    self.vehicle_tracker.reaction_times[track_id] = None
+                if track_id in entry_times and track_id not in reaction_times:
+                    reaction_times[track_id] = None
             
             # Maintain stationary status once achieved
-            if track_id in self.vehicle_tracker.stationary_vehicles:
+            if track_id in stationary_vehicles:
                 current_status = "stationary"
                 compliance = 1
             
@@ -99,21 +196,61 @@ class VehicleProcessor:
                 track_id, vehicle_type, previous_status, current_status
             )
             
-            self.vehicle_tracker.status_cache[track_id] = current_status
+            status_cache[track_id] = current_status
             
             # Prepare labels
             top_labels.append(f"{vehicle_type} {current_status}" if current_status != "moving" else vehicle_type)
             bottom_labels.append(f"#{track_id}")
             
             # Update history dictionary for vehicles in stop zone
-            if AnnotationManager.point_inside_polygon(orig_pt, Config.STOP_ZONE_POLYGON):
+            if in_zone:
                 self._update_tracking_history(
                     track_id, vehicle_type, current_status, compliance
                 )
         
+        if self._new_vehicle_ids:
+            self._apply_new_vehicle_counts()
+        
+        self._mark_seen(detections.tracker_id)
+        
         return top_labels, bottom_labels
     
-    def _process_stop_zone_vehicle(self, track_id, vehicle_type, trans_pt, current_status, compliance):
+    def _mark_seen(self, tracker_ids):
+        """Advance the frame index, remember when each track was last seen and periodically drop long-gone tracks"""
+        self._frame_index += 1
+        self._last_seen.update(dict.fromkeys(np.asarray(tracker_ids).tolist(), self._frame_index))
+        if self._frame_index % self.TRACK_EVICTION_INTERVAL == 0:
+            self._evict_stale_tracks()
+    
+    def _evict_stale_tracks(self):
+        """Forget per-track working state for tracks unseen for TRACK_STATE_TTL_FRAMES (counts and records are kept)"""
+        cutoff = self._frame_index - Config.TRACK_STATE_TTL_FRAMES
+        stale = [track_id for track_id, seen in self._last_seen.items() if seen < cutoff]
+        if not stale:
+            return
+        
+        for track_id in stale:
+            del self._last_seen[track_id]
+            self.tracker_types.pop(track_id, None)
+        self.vehicle_tracker.forget(stale)
+    
+    def _vehicle_types(self, class_ids):
+        """Map an array of class ids to vehicle type names through the lookup table"""
+        class_ids = np.asarray(class_ids, dtype=np.int64)
+        known = (class_ids >= 0) & (class_ids < len(self._class_lut))
+        vehicle_types = np.full(len(class_ids), "unknown", dtype=object)
+        vehicle_types[known] = self._class_lut[class_ids[known]]
+        return vehicle_types
+    
+    def _frame_timestamp(self, now):
+        """Format now as "%Y-%m-%d %H:%M:%S", re-formatting only when the second changes"""
+        second = int(now)
+        if second != self._timestamp_second:
+            self._timestamp_second = second
+            self._timestamp_str = datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+        return self._timestamp_str
+    
+    def _process_stop_zone_vehicle(self, track_id, vehicle_type, is_stationary, current_status, compliance):
         """Process vehicle in stop zone"""
         
         # Count vehicle if first time in zone
@@ -122,63 +259,60 @@ class VehicleProcessor:
         
         # Record entry time
         if track_id not in self.vehicle_tracker.entry_times:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.vehicle_tracker.entry_times[track_id] = time.time()
-            print(f"[DEBUG] Vehicle {track_id} ({vehicle_type}) entered stop zone at {current_time}")
+            self.vehicle_tracker.entry_times[track_id] = self._frame_time
+            if DEBUG_LOGS:
+                print(f"[DEBUG] Vehicle {track_id} ({vehicle_type}) entered stop zone at {self._frame_time_str}")
             
             record_key = (track_id, "entered")
             if record_key not in self.vehicle_tracker.written_records:
                 self.vehicle_tracker.written_records.add(record_key)
         
         # Check if stationary
-        if len(self.vehicle_tracker.position_history[track_id]) >= Config.FRAME_BUFFER:
-            if self._is_vehicle_stationary(track_id):
-                current_status, compliance = "stationary", 1
-                
-                if track_id not in self.vehicle_tracker.reaction_times:
-                    reaction_time = round(time.time() - self.vehicle_tracker.entry_times[track_id], 2)
-                    self.vehicle_tracker.reaction_times[track_id] = reaction_time
+        if is_stationary:
+            current_status, compliance = "stationary", 1
+            
+            if track_id not in self.vehicle_tracker.reaction_times:
+                reaction_time = round(self._frame_time - self.vehicle_tracker.entry_times[track_id], 2)
+                self.vehicle_tracker.reaction_times[track_id] = reaction_time
+                if DEBUG_LOGS:
                     print(f"[DEBUG] Vehicle {track_id} ({vehicle_type}) became stationary after {reaction_time}s")
         
         return current_status, compliance
     
     def _count_new_vehicle(self, track_id, vehicle_type):
         """Count a new vehicle entering the stop zone"""
-        print(f"[DEBUG] New vehicle counted: track_id={track_id}, type={vehicle_type}")
-        print(f"[DEBUG] Before increment: {vehicle_type} = {self.vehicle_type_counter[vehicle_type]}")
-        
-        self.vehicle_type_counter[vehicle_type] += 1
-        self.counted_ids.add(track_id)
-        self.session_tracker_ids.add(track_id)
-        self.session_vehicle_counts[vehicle_type] += 1
-        
-        print(f"[DEBUG] After increment: {vehicle_type} = {self.vehicle_type_counter[vehicle_type]}")
-        print(f"[DEBUG] Total counted vehicles: {len(self.counted_ids)}")
+        if DEBUG_LOGS:
+            print(f"[DEBUG] New vehicle counted: track_id={track_id}, type={vehicle_type}")
         
-        # Update vehicle counts in real-time
-        self._update_vehicle_counts_realtime(vehicle_type)
+        self._new_vehicle_ids.append(track_id)
+        self._new_vehicle_types.append(vehicle_type)
     
-    def _update_vehicle_counts_realtime(self, vehicle_type):
-        """Update vehicle counts in real-time - only update local counters, save at end"""
-        # Only update local counters, don't save to database in real-time
-        print(f"[INFO] Vehicle count updated locally: {vehicle_type} = {self.vehicle_type_counter[vehicle_type]}")
+    def _apply_new_vehicle_counts(self):
+        """Fold this frame's newly counted vehicles into the counters in one update each"""
+        self.vehicle_type_counter.update(self._new_vehicle_types)
+        self.session_vehicle_counts.update(self._new_vehicle_types)
+        self.counted_ids.update(self._new_vehicle_ids)
+        self.session_tracker_ids.update(self._new_vehicle_ids)
     
-    def _is_vehicle_stationary(self, track_id):
-        """Check if vehicle is stationary based on velocity"""
-        displacements = np.array([
-            np.linalg.norm(self.vehicle_tracker.position_history[track_id][i] - 
-                         self.vehicle_tracker.position_history[track_id][i - 1])
-            for i in range(1, len(self.vehicle_tracker.position_history[track_id]))
-        ])
-        weights = np.linspace(1, 2, len(displacements))
-        avg_velocity = np.average(displacements, weights=weights)
-        
-        return avg_velocity < Config.VELOCITY_THRESHOLD
+    def _stationary_track_ids(self, track_ids):
+        """Return the set of track_ids with a full position window whose weighted average velocity is below threshold"""
+        if len(track_ids) == 0:
+            return set()
+        
+        full, windows = self.vehicle_tracker.position_history.full_windows(track_ids)
+        if not full.any():
+            return set()
+        
+        weights, weight_sum = _velocity_weights(windows.shape[1] - 1)
+        avg_velocity = _weighted_velocities(windows, weights, weight_sum)
+        
+        return set(track_ids[full][avg_velocity < Config.VELOCITY_THRESHOLD].tolist())
     
     def _update_vehicle_status(self, track_id, vehicle_type, previous_status, current_status):
         """Update vehicle status and handle status changes"""
         if previous_status != current_status and previous_status != "":
-            print(f"[DEBUG] Vehicle {track_id} ({vehicle_type}) status changed: {previous_status} -> {current_status}")
+            if DEBUG_LOGS:
+                print(f"[DEBUG] Vehicle {track_id} ({vehicle_type}) status changed: {previous_status} -> {current_status}")
             if current_status == "stationary" or track_id not in self.vehicle_tracker.stationary_vehicles:
                 record_key = (track_id, current_status)
                 if record_key not in self.vehicle_tracker.written_records:
@@ -186,28 +320,30 @@ class VehicleProcessor:
                     
                     if current_status == "stationary":
                         self.vehicle_tracker.stationary_vehicles.add(track_id)
-                        print(f"[DEBUG] Vehicle {track_id} added to stationary vehicles list")
         
         return
     
     def _update_tracking_history(self, track_id, vehicle_type, current_status, compliance):
         """Update tracking history for vehicles in stop zone"""
-        existing_record = self.stop_zone_history_dict.get(str(track_id))
+        existing_record = self.stop_zone_history_dict.get(track_id)
         should_update = False
         
         if existing_record is None:
             should_update = True
-            print(f"[DEBUG] New vehicle in stop zone: track_id={track_id}, type={vehicle_type}")
+            if DEBUG_LOGS:
+                print(f"[DEBUG] New vehicle in stop zone: track_id={track_id}, type={vehicle_type}")
         elif (existing_record.get('status') != current_status or 
               existing_record.get('compliance') != compliance or
               existing_record.get('reaction_time') != self.vehicle_tracker.reaction_times.get(track_id)):
             should_update = True
-            print(f"[DEBUG] Status changed for vehicle: track_id={track_id}, status={existing_record.get('status')} -> {current_status}, compliance={existing_record.get('compliance')} -> {compliance}")
+            if DEBUG_LOGS:
+                print(f"[DEBUG] Status changed for vehicle: track_id={track_id}, status={existing_record.get('status')} -> {current_status}, compliance={existing_record.get('compliance')} -> {compliance}")
         
         if should_update:
             # Only fetch weather data when we actually need to update/save the record
-            print(f"[INFO] Fetching weather data for vehicle {track_id} ({vehicle_type}) - saving to database")
-            weather_data = self._get_current_weather_data()
+            if self._weather_for_frame is None:
+                self._weather_for_frame = self._get_current_weather_data()
+            weather_data = self._weather_for_frame
             
             current_record = {
                 "tracker_id": track_id,
@@ -222,60 +358,52 @@ class VehicleProcessor:
                 "visibility": weather_data.get('visibility'),
                 "precipitation_type": weather_data.get('precipitation_type'),
                 "wind_speed": weather_data.get('wind_speed'),
-                "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                "date": self._frame_time_str
             }
             
-            self.stop_zone_history_dict[str(track_id)] = current_record
-            self.changed_records[str(track_id)] = current_record
-            print(f"[DEBUG] Added/updated vehicle {track_id} in changed records. Changed records: {len(self.changed_records)}")
+            self.stop_zone_history_dict[track_id] = current_record
+            self.changed_records[track_id] = current_record
     
         return
     
     def save_all_data_at_end(self):
         """Save all collected data in one batch at the end of processing with video_id link"""
-        # Always save to database in batch with video_id
-        if self.changed_records:
-            from clients.supabase_client import supabase_manager
-            print(f"[INFO] Saving {len(self.changed_records)} records in final batch for video {self.video_id}...")
-            
-            # Convert to list for batch save
-            all_records = []
-            for track_id_str, data in self.changed_records.items():
-                all_records.append(data)
-            
-            # Save all records in one batch operation with video_id
-            success = supabase_manager.save_tracking_data_batch(all_records, self.video_id)
-            if success:
+        from clients.supabase_client import supabase_manager
+        
+        all_records = list(self.changed_records.values())
+        if all_records:
+            print(f"[INFO] Saving {len(all_records)} records in final batch for video {self.video_id}...")
+            # Later videos in this process must continue after the ids written here
+            self.data_manager.advance_tracker_id(int(max(self.changed_records)))
+        else:
+            print("[INFO] No records to save at end of processing")
+        
+        if self.vehicle_type_counter:
+            print(f"[INFO] Saving {len(self.vehicle_type_counter)} vehicle counts to database in final batch for video {self.video_id}...")
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        
+        # Tracking rows and vehicle counts go to independent tables, so both round-trips run concurrently
+        tracking_future = self.data_manager.submit_io(
+            supabase_manager.save_tracking_data_columnar, all_records, self.video_id
+        ) if all_records else None
+        counts_future = self.data_manager.submit_io(
+            supabase_manager.save_vehicle_counts_rpc, dict(self.vehicle_type_counter), current_date, self.video_id
+        ) if self.vehicle_type_counter else None
+        
+        if tracking_future is not None:
+            if tracking_future.result():
                 print(f"[INFO] Successfully saved {len(all_records)} records in final batch for video {self.video_id}")
             else:
                 print(f"[ERROR] Failed to save {len(all_records)} records in final batch for video {self.video_id}")
             
             # Clear the collected records
             self.changed_records.clear()
-        else:
-            print("[INFO] No records to save at end of processing")
         
-        # Save vehicle counts to database in batch with video_id
-        if self.vehicle_type_counter:
-            from clients.supabase_client import supabase_manager
-            print(f"[INFO] Saving {len(self.vehicle_type_counter)} vehicle counts to database in final batch for video {self.video_id}...")
-            
-            # Convert vehicle counts to list for batch save
-            current_date = datetime.now().strftime("%Y-%m-%d")
-            vehicle_count_records = []
-            for vehicle_type, count in self.vehicle_type_counter.items():
-                vehicle_count_records.append({
-                    "vehicle_type": vehicle_type,
-                    "count": count,
-                    "date": current_date
-                })
-            
-            # Save all vehicle counts in one batch operation with video_id
-            success = supabase_manager.save_vehicle_count_batch(vehicle_count_records, self.video_id)
-            if success:
-                print(f"[INFO] Successfully saved {len(vehicle_count_records)} vehicle counts to database in final batch for video {self.video_id}")
+        if counts_future is not None:
+            if counts_future.result():
+                print(f"[INFO] Successfully saved {len(self.vehicle_type_counter)} vehicle counts to database in final batch for video {self.video_id}")
             else:
-                print(f"[ERROR] Failed to save {len(vehicle_count_records)} vehicle counts to database for video {self.video_id}")
+                print(f"[ERROR] Failed to save {len(self.vehicle_type_counter)} vehicle counts to database for video {self.video_id}")
     
     def get_session_data(self):
         """Get session data for return with video_id filtering"""
@@ -288,16 +416,27 @@ class VehicleProcessor:
         return session_data
     
     def _get_api_session_data(self, current_date):
-        """Get session data from database with video_id filter"""
+        """Get session data from the in-memory history, querying the database (video_id filter) only for missing ids"""
         from clients.supabase_client import supabase_manager
         
         session_tracking_data = []
         try:
             if self.session_tracker_ids:
-                for tracker_id in self.session_tracker_ids:
+                # Every record this session wrote is still in stop_zone_history_dict
+                history = self.stop_zone_history_dict
+                tracker_ids = []
+                for tid in sorted(int(tid) for tid in self.session_tracker_ids):
+                    record = history.get(tid)
+                    if record is not None:
+                        session_tracking_data.append(record)
+                    else:
+                        tracker_ids.append(tid)
+                
+                chunk_size = self.SESSION_QUERY_CHUNK_SIZE
+                for start in range(0, len(tracker_ids), chunk_size):
                     result = supabase_manager.client.table("tracking_results") \
                         .select("*") \
-                        .eq("tracker_id", tracker_id) \
+                        .in_("tracker_id", tracker_ids[start:start + chunk_size]) \
                         .eq("video_id", self.video_id) \
                         .execute()
                     if result.data:
@@ -324,10 +463,6 @@ class VehicleProcessor:
     
     def _get_current_weather_data(self):
         """Get current weather data for the location (cached per session with performance optimization)"""
-        # Get location coordinates from config
-        lat = getattr(Config, 'LOCATION_LAT', -37.740585)  # Melbourne coordinates
-        lon = getattr(Config, 'LOCATION_LON', 144.731637)  # Melbourne coordinates
-        
         # Check if weather API is disabled for maximum performance
         if not Config.ENABLE_WEATHER_API:
             return {
@@ -339,21 +474,35 @@ class VehicleProcessor:
                 'wind_speed': 5.0
             }
         
-        # Check cache validity (5 minutes = 300 seconds)
-        import time
-        current_time = time.time()
-        if (self._weather_cache is not None and 
-            self._weather_cache_time is not None and 
-            current_time - self._weather_cache_time < Config.WEATHER_CACHE_DURATION):
-            print(f"[WEATHER] Using cached weather data (age: {current_time - self._weather_cache_time:.1f}s)")
-            return self._weather_cache
-        
-        # Fetch fresh weather data
-        print(f"[WEATHER] Fetching fresh weather data for location ({lat}, {lon})")
-        weather_data = weather_manager.get_weather_for_analysis(lat, lon)
+        # Serve from cache; once 80% of the TTL has passed, refresh in the background and keep
+        # returning the cached value so the frame loop never waits on the weather API
+        with self._weather_lock:
+            weather_cache, cache_time = self._weather_cache, self._weather_cache_time
+            if weather_cache is not None and cache_time is not None:
+                age = time.time() - cache_time
+                if age >= Config.WEATHER_CACHE_DURATION * self.WEATHER_REFRESH_FRACTION and not self._weather_refreshing:
+                    self._weather_refreshing = True
+                    self.data_manager.submit_io(self._refresh_weather)
+                if DEBUG_LOGS:
+                    print(f"[WEATHER] Using cached weather data (age: {age:.1f}s)")
+                return weather_cache
         
-        # Cache the result
-        self._weather_cache = weather_data
-        self._weather_cache_time = current_time
+        # Nothing cached yet - fetch synchronously once
+        return self._refresh_weather()
+    
+    def _refresh_weather(self):
+        """Fetch fresh weather data and swap it into the cache (failures are logged here, background ones are not awaited)"""
+        try:
+            print(f"[WEATHER] Fetching fresh weather data for location ({self._lat}, {self._lon})")
+            weather_data = weather_manager.get_weather_for_analysis(self._lat, self._lon)
+        except Exception as e:
+            print(f"[WARNING] Weather refresh failed, cached data (if any) stays in use: {e}")
+            with self._weather_lock:
+                self._weather_refreshing = False
+            raise
         
+        with self._weather_lock:
+            self._weather_cache = weather_data
+            self._weather_cache_time = time.time()
+            self._weather_refreshing = False
         return weather_data
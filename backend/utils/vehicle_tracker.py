@@ -1,16 +1,144 @@
 import numpy as np
 import time
-from collections import defaultdict, Counter, deque
 from datetime import datetime
 import supervision as sv
 from config.config import Config
 
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+def _iou_matrix_numpy(boxes):
+    """Pairwise IoU of (N, 4) float64 xyxy boxes via broadcasting"""
+    xi1 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    yi1 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    xi2 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+    yi2 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+    
+    intersection = np.clip(xi2 - xi1, 0, None) * np.clip(yi2 - yi1, 0, None)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    union = areas[:, None] + areas[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def _iou_matrix(boxes):
+        """Pairwise IoU of (N, 4) float64 xyxy boxes, filling both triangles from one pass over i < j"""
+        n = boxes.shape[0]
+        iou = np.zeros((n, n))
+        for i in range(n):
+            area_i = (boxes[i, 2] - boxes[i, 0]) * (boxes[i, 3] - boxes[i, 1])
+            if area_i > 0:
+                iou[i, i] = 1.0
+            for j in range(i + 1, n):
+                w = min(boxes[i, 2], boxes[j, 2]) - max(boxes[i, 0], boxes[j, 0])
+                h = min(boxes[i, 3], boxes[j, 3]) - max(boxes[i, 1], boxes[j, 1])
+                if w <= 0 or h <= 0:
+                    continue
+                intersection = w * h
+                union = area_i + (boxes[j, 2] - boxes[j, 0]) * (boxes[j, 3] - boxes[j, 1]) - intersection
+                if union > 0:
+                    iou[i, j] = iou[j, i] = intersection / union
+        return iou
+    
+    # Compile now so the first merged frame doesn't pay the JIT cost
+    _iou_matrix(np.zeros((1, 4)))
+else:
+    _iou_matrix = _iou_matrix_numpy
+
+class TrackRingBuffer:
+    """Per-tracker ring buffers of the last `window` values, stored in one (slots, window, *item_shape) slab"""
+    
+    def __init__(self, window, item_shape=(), dtype=np.float32, capacity=64):
+        self.window = window
+        self.buf = np.empty((capacity, window, *item_shape), dtype=dtype)
+        self.length = np.zeros(capacity, dtype=np.int32)
+        self.head = np.zeros(capacity, dtype=np.int32)  # Next write index per slot
+        self.slots = {}  # track_id -> slot
+        self.free_slots = list(range(capacity - 1, -1, -1))
+    
+    def _grow(self):
+        """Double the slab when every slot is in use"""
+        capacity = len(self.buf)
+        self.buf = np.concatenate([self.buf, np.empty_like(self.buf)])
+        self.length = np.concatenate([self.length, np.zeros_like(self.length)])
+        self.head = np.concatenate([self.head, np.zeros_like(self.head)])
+        self.free_slots.extend(range(2 * capacity - 1, capacity - 1, -1))
+    
+    def append(self, track_id, value):
+        """Record a value for track_id, overwriting the oldest once the window is full"""
+        slot = self.slots.get(track_id)
+        if slot is None:
+            if not self.free_slots:
+                self._grow()
+            slot = self.free_slots.pop()
+            self.slots[track_id] = slot
+            self.length[slot] = 0
+            self.head[slot] = 0
+        
+        head = self.head[slot]
+        self.buf[slot, head] = value
+        self.head[slot] = (head + 1) % self.window
+        if self.length[slot] < self.window:
+            self.length[slot] += 1
+    
+    def clear(self, track_id):
+        """Drop the history for track_id and release its slot"""
+        slot = self.slots.pop(track_id, None)
+        if slot is not None:
+            self.free_slots.append(slot)
+    
+    def count(self, track_id):
+        """Number of values currently held for track_id"""
+        slot = self.slots.get(track_id)
+        return 0 if slot is None else int(self.length[slot])
+    
+    def get(self, track_id):
+        """Values for track_id, oldest first"""
+        slot = self.slots.get(track_id)
+        if slot is None:
+            return self.buf[:0, 0]
+        if self.length[slot] < self.window:
+            return self.buf[slot, :self.length[slot]]
+        return np.roll(self.buf[slot], -self.head[slot], axis=0)
+
+class PositionHistory(TrackRingBuffer):
+    """Last `window` (x, y) positions per tracker as float32"""
+    
+    def __init__(self, window, capacity=64):
+        super().__init__(window, item_shape=(2,), dtype=np.float32, capacity=capacity)
+    
+    def full_windows(self, track_ids):
+        """Return (mask over track_ids whose window is full, their positions as a (K, window, 2) array oldest first)"""
+        slots = np.fromiter((self.slots.get(tid, -1) for tid in track_ids), dtype=np.int64, count=len(track_ids))
+        full = slots >= 0
+        full[full] = self.length[slots[full]] == self.window
+        slots = slots[full]
+        order = (self.head[slots, None] + np.arange(self.window)) % self.window
+        return full, self.buf[slots[:, None], order]
+
+class ClassHistory(TrackRingBuffer):
+    """Last `window` class ids per tracker as uint8, voted with np.bincount"""
+    
+    def __init__(self, window, capacity=64):
+        super().__init__(window, item_shape=(), dtype=np.uint8, capacity=capacity)
+    
+    def majority(self, track_id):
+        """Return (most common class id, its count); ties go to the class seen first, as Counter.most_common does"""
+        history = self.get(track_id)
+        counts = np.bincount(history)
+        best_count = counts.max()
+        first_best = np.argmax(counts[history] == best_count)
+        return int(history[first_best]), int(best_count)
+
 class VehicleTracker:
     """Handles vehicle tracking logic"""
     
     def __init__(self):
-        self.position_history = defaultdict(lambda: deque(maxlen=Config.FRAME_BUFFER))
-        self.class_history = defaultdict(lambda: deque(maxlen=Config.CLASS_HISTORY_FRAMES))
+        self.position_history = PositionHistory(Config.FRAME_BUFFER)
+        self.class_history = ClassHistory(Config.CLASS_HISTORY_FRAMES)
         self.stable_class = {}
         self.status_cache = {}
         self.stationary_vehicles = set()
@@ -18,6 +146,19 @@ class VehicleTracker:
         self.reaction_times = {}
         self.written_records = set()
     
+    def forget(self, track_ids):
+        """Drop all per-track state for tracks that are gone for good"""
+        for track_id in track_ids:
+            self.position_history.clear(track_id)
+            self.class_history.clear(track_id)
+            self.stable_class.pop(track_id, None)
+            self.status_cache.pop(track_id, None)
+            self.entry_times.pop(track_id, None)
+            self.reaction_times.pop(track_id, None)
+            self.stationary_vehicles.discard(track_id)
+            for status in ("entered", "moving", "stationary"):
+                self.written_records.discard((track_id, status))
+    
     def calculate_iou(self, box1, box2):
         """Calculate Intersection over Union of two bounding boxes"""
         x1, y1, x2, y2 = box1
@@ -36,6 +177,11 @@ class VehicleTracker:
         
         return intersection / union if union > 0 else 0.0
     
+    @staticmethod
+    def iou_matrix(boxes):
+        """Pairwise IoU of an (N, 4) array of xyxy boxes as an (N, N) matrix"""
+        return _iou_matrix(np.ascontiguousarray(boxes, dtype=np.float64).reshape(-1, 4))
+    
     def merge_overlapping_detections(self, detections):
         """Merge overlapping detections to prevent duplicate tracker IDs"""
         if len(detections) <= 1:
@@ -54,24 +200,21 @@ class VehicleTracker:
             print(f"  boxes: {len(boxes)}, classes: {len(classes)}, confidences: {len(confidences)}")
             return detections
         
-        merged_indices, used_indices = [], set()
+        # All pairwise overlaps at once; only the upper triangle (j > i) takes part in grouping
+        overlaps = np.triu(self.iou_matrix(boxes) > Config.DETECTION_OVERLAP_THRESHOLD, k=1)
+        
+        # Greedy grouping: each unused box claims every later unused box it overlaps
+        merged_indices = []
+        used = np.zeros(len(boxes), dtype=bool)
         
         for i in range(len(boxes)):
-            if i in used_indices:
+            if used[i]:
                 continue
             
-            current_group = [i]
-            used_indices.add(i)
-            
-            for j in range(i + 1, len(boxes)):
-                if j in used_indices:
-                    continue
-                
-                if self.calculate_iou(boxes[i], boxes[j]) > Config.DETECTION_OVERLAP_THRESHOLD:
-                    current_group.append(j)
-                    used_indices.add(j)
-            
-            merged_indices.append(current_group)
+            partners = np.flatnonzero(overlaps[i] & ~used)
+            used[i] = True
+            used[partners] = True
+            merged_indices.append([i, *partners.tolist()])
         
         # Create merged detections
         merged_boxes, merged_classes, merged_confidences = [], [], []
@@ -85,8 +228,8 @@ class VehicleTracker:
             else:
                 group_confidences = confidences[group]
                 best_idx = np.argmax(group_confidences)
-                weights = group_confidences / np.sum(group_confidences)
-                avg_box = np.average(boxes[group], axis=0, weights=weights)
+                # Confidence-weighted mean box as one (k,) @ (k, 4) product
+                avg_box = (group_confidences / group_confidences.sum()) @ boxes[group]
                 
                 merged_boxes.append(avg_box)
                 merged_classes.append(classes[group[best_idx]])
@@ -117,22 +260,26 @@ class VehicleTracker:
             print(f"  tracker_id: {len(detections.tracker_id)}, class_id: {len(detections.class_id)}")
             return
         
-        for i, track_id in enumerate(detections.tracker_id):
-            if i >= len(detections.class_id):
-                print(f"[WARNING] Index {i} out of bounds for class_id array (length: {len(detections.class_id)})")
-                continue
-                
-            current_class = detections.class_id[i]
-            self.class_history[track_id].append(current_class)
+        tracker_ids = np.asarray(detections.tracker_id)
+        stable_class = self.stable_class
+        
+        # Tracks with an established class just take it in one indexed assignment
+        stable_mask = np.fromiter((tid in stable_class for tid in tracker_ids), dtype=bool, count=len(tracker_ids))
+        if stable_mask.any():
+            detections.class_id[stable_mask] = [stable_class[tid] for tid in tracker_ids[stable_mask]]
+        
+        # Only the remaining tracks record their class and vote
+        for i in np.flatnonzero(~stable_mask):
+            track_id = tracker_ids[i]
+            self.class_history.append(track_id, detections.class_id[i])
             
-            if track_id in self.stable_class:
-                detections.class_id[i] = self.stable_class[track_id]
-            elif len(self.class_history[track_id]) >= 3:
-                class_counts = Counter(self.class_history[track_id])
-                most_common_class, most_common_count = class_counts.most_common(1)[0]
-                confidence_ratio = most_common_count / len(self.class_history[track_id])
+            history_len = self.class_history.count(track_id)
+            if history_len >= 3:
+                most_common_class, most_common_count = self.class_history.majority(track_id)
+                confidence_ratio = most_common_count / history_len
                 
                 if confidence_ratio >= Config.CLASS_CONFIDENCE_THRESHOLD:
-                    self.stable_class[track_id] = most_common_class
+                    stable_class[track_id] = most_common_class
                     detections.class_id[i] = most_common_class
+                    self.class_history.clear(track_id)  # No longer consulted once the class is stable
                     print(f"[INFO] Vehicle #{track_id} class established as {Config.CLASS_NAMES.get(most_common_class, 'unknown')}")
@@ -1,13 +1,11 @@
 import asyncio
-import json
-import base64
+import struct
 import numpy as np
 from typing import Dict, Set
 from fastapi import WebSocket
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
-import queue
 from config.config import Config
 
 # Conditional imports for different environments
@@ -39,17 +37,31 @@ try:
 except ImportError:
     HAS_PIL = False
 
+# libjpeg-turbo's SIMD encoder, shared by every stream; needs the native library as well as the wrapper
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420, TJFLAG_FASTDCT
+    _turbo_jpeg = TurboJPEG()
+    HAS_TURBOJPEG = True
+    print("[STREAM] TurboJPEG available for frame encoding")
+except (ImportError, OSError, RuntimeError):
+    HAS_TURBOJPEG = False
+
+# Binary frame header: message type, send timestamp, frame number (13 bytes, little-endian), then the JPEG
+FRAME_HEADER = struct.Struct('<BdI')
+MSG_TYPE_FRAME = 1
+
 class VideoStreamer:
     """High-performance video streaming with WebSocket support"""
     
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
         self.streaming_active = False
+        # Latest-frame-wins slot: the producer overwrites it, the streaming thread takes it and waits on the event
         self.current_frame = None
         self.frame_lock = threading.Lock()
+        self.frame_event = threading.Event()
         self.connection_lock = threading.Lock()
         self.streaming_thread = None
-        self.frame_queue = queue.Queue(maxsize=Config.STREAMING_QUEUE_SIZE)
         self.executor = ThreadPoolExecutor(max_workers=Config.STREAMING_WORKERS)
         
         # Performance settings from config
@@ -57,25 +69,39 @@ class VideoStreamer:
         self.jpeg_quality = Config.STREAMING_JPEG_QUALITY
         self.max_frame_size = Config.STREAMING_MAX_FRAME_SIZE
         self.target_fps = getattr(Config, 'STREAMING_TARGET_FPS', 30)
+        self.send_timeout = getattr(Config, 'STREAMING_SEND_TIMEOUT', 2.0)
         
         # Frame rate limiting for smooth playback
         self.last_frame_time = 0
         self.frame_interval = 1.0 / self.target_fps  # Time between frames in seconds
         
+        # Resize output reused across frames; each resized frame is encoded before the next one is resized
+        self._resize_buffer = None
+        # (width, height, interpolation) computed for the last input shape (None when frames of that shape already fit)
+        self._resize_in_shape = None
+        self._resize_plan = None
+        
         # Logging counters
         self.frames_processed = 0
         self.frames_sent = 0
         self.connection_count = 0
-        self._pending_message = None
+        
+        # Broadcasts run on the server's event loop; the streaming thread schedules at most one at a time
+        self.loop = None
+        self._broadcast_future = None
+        # Per-client asyncio locks: frame broadcasts and the endpoint's ping/pong write to the same socket
+        self.send_locks: Dict[str, asyncio.Lock] = {}
         
         print("[STREAM] VideoStreamer initialized - ready for WebSocket connections")
         
     async def connect(self, websocket: WebSocket, client_id: str):
         """Connect a new client to the video stream"""
         print(f"[STREAM] 🔌 Attempting to connect client: {client_id}")
+        self.loop = asyncio.get_running_loop()
         
         with self.connection_lock:
             self.active_connections[client_id] = websocket
+            self.send_locks[client_id] = asyncio.Lock()
             self.connection_count += 1
             
             # Start streaming if this is the first client
@@ -92,6 +118,7 @@ class VideoStreamer:
         with self.connection_lock:
             if client_id in self.active_connections:
                 del self.active_connections[client_id]
+                self.send_locks.pop(client_id, None)
                 self.connection_count += 1
                 
                 # Stop streaming if no clients are left
@@ -112,13 +139,10 @@ class VideoStreamer:
         try:
             self.frames_processed += 1
             
-            # Simple resize without complex processing
-            frame = self._quick_resize(frame)
-            
-            # Clear queue and add new frame immediately
-            while not self.frame_queue.empty():
-                self.frame_queue.get_nowait()
-            self.frame_queue.put_nowait(frame)
+            # Hand the frame over as-is, replacing any frame not yet taken; resizing and encoding happen on the streaming thread
+            with self.frame_lock:
+                self.current_frame = frame
+                self.frame_event.set()
             
             # Minimal logging for performance
             if self.frames_processed % 500 == 0:
@@ -131,34 +155,45 @@ class VideoStreamer:
         """Fast resize for smooth streaming with minimal processing"""
         if frame is None or frame.size == 0:
             return frame
-            
-        height, width = frame.shape[:2]
-        max_width, max_height = self.max_frame_size
         
-        # Only resize if necessary
-        if width <= max_width and height <= max_height:
+        # Only resize if necessary; the stream's frame shape rarely changes, so the target is cached per shape
+        if frame.shape != self._resize_in_shape:
+            self._resize_in_shape, self._resize_plan = frame.shape, self._resize_target(frame.shape)
+        if self._resize_plan is None:
             return frame
         
-        # Calculate new dimensions
-        scale = min(max_width / width, max_height / height)
-        new_width = int(width * scale)
-        new_height = int(height * scale)
+        new_width, new_height, interpolation = self._resize_plan
         
-        # Use high-quality resize method for better visual quality
         if HAS_CV2:
-            # Use OpenCV with high-quality interpolation
-            frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_CUBIC)
+            # Use OpenCV, writing into the reused output buffer
+            out_shape = (new_height, new_width) + frame.shape[2:]
+            if self._resize_buffer is None or self._resize_buffer.shape != out_shape or self._resize_buffer.dtype != frame.dtype:
+                self._resize_buffer = np.empty(out_shape, dtype=frame.dtype)
+            frame = cv2.resize(frame, (new_width, new_height), dst=self._resize_buffer, interpolation=interpolation)
         elif HAS_PIL:
             # Use PIL with high-quality method
             pil_image = PIL.Image.fromarray(frame)
             frame = np.array(pil_image.resize((new_width, new_height), PIL.Image.LANCZOS))
         else:
             # Simple numpy resize as last resort
+            height, width = frame.shape[:2]
             frame = np.array([[frame[int(i*height/new_height), int(j*width/new_width)] 
                              for j in range(new_width)] for i in range(new_height)])
         
         return frame
             
+    def _resize_target(self, shape):
+        """Output (width, height, interpolation) for frames of this shape, or None if they already fit max_frame_size"""
+        height, width = shape[:2]
+        max_width, max_height = self.max_frame_size
+        if width <= max_width and height <= max_height:
+            return None
+        
+        scale = min(max_width / width, max_height / height)
+        # Area averaging for large downscales avoids aliasing (and compresses better); bilinear is enough otherwise
+        interpolation = (cv2.INTER_AREA if scale < 0.5 else Config.STREAMING_INTERPOLATION) if HAS_CV2 else None
+        return int(width * scale), int(height * scale), interpolation
+    
     def start_streaming(self):
         """Start the video streaming loop"""
         if not self.streaming_active:
@@ -173,6 +208,7 @@ class VideoStreamer:
         """Stop the video streaming loop"""
         if self.streaming_active:
             self.streaming_active = False
+            self.frame_event.set()  # Wake the streaming thread so it sees the stop immediately
             if self.streaming_thread:
                 self.streaming_thread.join(timeout=0.5)
             print(f"[STREAM] 🛑 Video streaming stopped - processed {self.frames_processed} frames, sent {self.frames_sent} frames")
@@ -186,60 +222,59 @@ class VideoStreamer:
         
         while self.streaming_active:
             try:
-                # Get frame immediately
-                try:
-                    frame = self.frame_queue.get_nowait()
-                    # Minimal logging for RunPod performance
-                    if frame_count % 500 == 0:
-                        print(f"[STREAM] 🎬 Received frame {frame_count + 1} from queue")
-                except queue.Empty:
-                    time.sleep(0.0001)  # 0.1ms sleep for faster processing
+                # Sleep until a frame arrives instead of polling
+                if not self.frame_event.wait(timeout=0.1):
+                    continue
+                with self.frame_lock:
+                    frame, self.current_frame = self.current_frame, None
+                    self.frame_event.clear()
+                if frame is None:
                     continue
                 
+                # Minimal logging for RunPod performance
+                if frame_count % 500 == 0:
+                    print(f"[STREAM] 🎬 Received frame {frame_count + 1}")
+                
                 frame_count += 1
                 
                 # Frame rate limiting for smooth playback
                 current_time = time.time()
                 time_since_last_frame = current_time - self.last_frame_time
                 
-                # Send frames at target FPS rate with frame skipping
-                if time_since_last_frame >= self.frame_interval and frame_count % self.frame_skip == 0:
-                    # Encode frame directly (no thread pool for speed)
-                    encoded_frame = self._fast_encode(frame)
+                # Send frames at target FPS rate with frame skipping, once the previous broadcast has gone out
+                if (time_since_last_frame >= self.frame_interval and frame_count % self.frame_skip == 0
+                        and self._broadcast_idle()):
+                    # Resize and encode only the frames that are actually sent
+                    encoded_frame = self._fast_encode(self._quick_resize(frame))
                     
                     if encoded_frame:
                         self.frames_sent += 1
                         self.last_frame_time = current_time
                         
-                        # Prepare message
-                        message = {
-                            "type": "frame",
-                            "frame_data": encoded_frame,
-                            "timestamp": current_time,
-                            "frame_number": frame_count
-                        }
+                        # Prepare a binary message: fixed header followed by the raw JPEG
+                        message = FRAME_HEADER.pack(MSG_TYPE_FRAME, current_time, frame_count) + encoded_frame
                         
-                        # Store message for async broadcast (will be sent by the WebSocket handler)
-                        self._pending_message = json.dumps(message)
+                        self._broadcast_future = asyncio.run_coroutine_threadsafe(
+                            self._broadcast_message(message), self.loop
+                        )
                         
                         # Minimal logging for performance
                         if self.frames_sent % 200 == 0:
                             print(f"[STREAM] 📡 Sent {self.frames_sent} frames to {len(self.active_connections)} clients")
                 
-                # Balanced sleep for smooth playback
-                time.sleep(0.001)  # 1ms sleep for smooth playback
-                
             except Exception as e:
                 print(f"[STREAM] ❌ Error in streaming loop: {e}")
-                time.sleep(0.001)  # Minimal error recovery
                 
         print(f"[STREAM] 🔄 Streaming loop ended - processed {frame_count} frames")
                 
-    def _fast_encode(self, frame: np.ndarray) -> str:
-        """High-quality frame encoding for smooth streaming"""
+    def _fast_encode(self, frame: np.ndarray) -> bytes:
+        """Encode a BGR frame to JPEG bytes for streaming"""
         try:
-            # Use OpenCV for high-quality encoding
-            if HAS_CV2:
+            if HAS_TURBOJPEG:
+                return _turbo_jpeg.encode(
+                    frame, quality=self.jpeg_quality, jpeg_subsample=TJSAMP_420, flags=TJFLAG_FASTDCT
+                )
+            elif HAS_CV2:
                 # Enhanced encoding parameters for better quality
                 encode_params = [
                     cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality,
@@ -247,38 +282,71 @@ class VideoStreamer:
                     cv2.IMWRITE_JPEG_PROGRESSIVE, 1
                 ]
                 _, buffer = cv2.imencode('.jpg', frame, encode_params)
-                return base64.b64encode(buffer).decode('utf-8')
+                return buffer.tobytes()
             elif HAS_PIL:
                 # Use PIL with better quality settings
                 pil_image = PIL.Image.fromarray(frame)
                 import io
                 buffer = io.BytesIO()
                 pil_image.save(buffer, format='JPEG', quality=self.jpeg_quality, optimize=True)
-                return base64.b64encode(buffer.getvalue()).decode('utf-8')
+                return buffer.getvalue()
             else:
-                # Simple base64 encoding as last resort
-                return base64.b64encode(frame.tobytes()).decode('utf-8')
+                # Raw pixels as last resort
+                return frame.tobytes()
                 
         except Exception as e:
             print(f"[STREAM] Encoding error: {e}")
             return None
                 
-    async def _broadcast_message(self, message: str):
-        """Broadcast a message to all connected clients"""
+    def _broadcast_idle(self) -> bool:
+        """Check that the event loop is known and no broadcast is still in flight"""
+        return self.loop is not None and (self._broadcast_future is None or self._broadcast_future.done())
+    
+    def _send_lock(self, client_id: str) -> asyncio.Lock:
+        """Get the lock serialising writes to a client's socket (a private one once the client is gone)"""
+        with self.connection_lock:
+            return self.send_locks.get(client_id) or asyncio.Lock()
+    
+    async def send_text(self, websocket: WebSocket, client_id: str, message: str):
+        """Send a text message to a client without interleaving it with a frame broadcast"""
+        async with self._send_lock(client_id):
+            await websocket.send_text(message)
+    
+    async def _send_bytes(self, websocket: WebSocket, client_id: str, message: bytes):
+        """Send a binary message to a client without interleaving it with its ping/pong traffic"""
+        async with self._send_lock(client_id):
+            await websocket.send_bytes(message)
+    
+    async def _broadcast_message(self, message: bytes):
+        """Broadcast a message to all connected clients concurrently"""
         disconnected_clients = []
         
+        # Never hold the thread lock across an await: connect/disconnect take it on this same loop
         with self.connection_lock:
-            for client_id, websocket in self.active_connections.items():
-                try:
-                    await websocket.send_text(message)
-                except Exception as e:
-                    print(f"[STREAM] ❌ Failed to send to client {client_id}: {e}")
-                    disconnected_clients.append(client_id)
+            clients = list(self.active_connections.items())
+        
+        # Sends overlap, and each is bounded so a stalled client cannot hold the broadcast slot for everyone
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self._send_bytes(websocket, client_id, message), self.send_timeout)
+              for client_id, websocket in clients),
+            return_exceptions=True
+        )
+        for (client_id, websocket), result in zip(clients, results):
+            if isinstance(result, asyncio.TimeoutError):
+                print(f"[STREAM] ⏱️ Client {client_id} did not accept a frame within {self.send_timeout}s")
+                disconnected_clients.append((client_id, websocket))
+            elif isinstance(result, Exception):
+                print(f"[STREAM] ❌ Failed to send to client {client_id}: {result}")
+                disconnected_clients.append((client_id, websocket))
                     
-        # Clean up disconnected clients
-        for client_id in disconnected_clients:
+        # Clean up disconnected clients; closing the socket also ends their endpoint loop
+        for client_id, websocket in disconnected_clients:
             print(f"[STREAM] 🧹 Cleaning up disconnected client: {client_id}")
             await self.disconnect(client_id)
+            try:
+                await asyncio.wait_for(websocket.close(code=1011), self.send_timeout)
+            except Exception:
+                pass
             
     def get_connection_count(self) -> int:
         """Get number of active connections"""
@@ -294,7 +362,7 @@ class VideoStreamer:
                 "total_connections": self.connection_count,
                 "frames_processed": self.frames_processed,
                 "frames_sent": self.frames_sent,
-                "queue_size": self.frame_queue.qsize(),
+                "queue_size": int(self.current_frame is not None),
                 "frame_skip": self.frame_skip,
                 "jpeg_quality": self.jpeg_quality,
                 "frame_size": self.max_frame_size,
@@ -125,7 +125,12 @@ export interface JobsResponse {
   all_jobs: Job[];
 }
 
-export interface StreamFrame {
-  type: 'frame';
-  frame_data: string; // base64 encoded image
+// Binary stream messages: 13-byte little-endian header (uint8 type, float64 timestamp, uint32 frame number) + JPEG
+export const STREAM_FRAME_HEADER_BYTES = 13;
+export const STREAM_MSG_TYPE_FRAME = 1;
+
+export interface StreamFrameHeader {
+  type: number;
+  timestamp: number;
+  frame_number: number;
 }
\ No newline at end of file
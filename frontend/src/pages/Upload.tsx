@@ -14,7 +14,15 @@ import {
   shutdownAllRunPodJobs,
   shutdownSpecificRunPodJob
 } from '../lib/api';
-import { Video, Job, JobsSummary, JobsResponse, StreamFrame } from '../lib/types';
+import {
+  Video,
+  Job,
+  JobsSummary,
+  JobsResponse,
+  StreamFrameHeader,
+  STREAM_FRAME_HEADER_BYTES,
+  STREAM_MSG_TYPE_FRAME,
+} from '../lib/types';
 import { getStoredTheme } from '../lib/theme';
 
 const ALLOWED_VIDEO_TYPES = [
@@ -105,6 +113,7 @@ function UploadPage() {
 
   const jobsWSRef = React.useRef<WebSocket | null>(null);
   const streamWSRef = React.useRef<WebSocket | null>(null);
+  const streamFrameUrlRef = React.useRef<string | null>(null);
   const shouldReconnectRef = React.useRef<boolean>(true);
 
   const fileInputRef = React.useRef<HTMLInputElement>(null);
@@ -266,10 +275,19 @@ function UploadPage() {
     };
   };
 
+  // Frames are shown through object URLs; release the previous one whenever it is replaced
+  const showStreamFrame = (url: string | null) => {
+    if (streamFrameUrlRef.current) {
+      URL.revokeObjectURL(streamFrameUrlRef.current);
+    }
+    streamFrameUrlRef.current = url;
+    setStreamFrame(url);
+  };
+
   const openStream = (jobId: string) => {
     setCurrentStreamJobId(jobId);
     setStreamModalOpen(true);
-    setStreamFrame(null);
+    showStreamFrame(null);
     setStreamStatus('Connecting...');
 
     try {
@@ -284,6 +302,7 @@ function UploadPage() {
     const runpodUrl = import.meta.env.VITE_RUNPOD_URL || 'http://localhost:8000';
     const wsUrl = runpodUrl.replace(/^http/, 'ws') + `/ws/video-stream/${encodeURIComponent(jobId)}`;
     streamWSRef.current = new WebSocket(wsUrl);
+    streamWSRef.current.binaryType = 'arraybuffer';
 
     streamWSRef.current.onopen = () => {
       setStreamStatus('Connected. Waiting for frames...');
@@ -291,9 +310,19 @@ function UploadPage() {
 
     streamWSRef.current.onmessage = (evt) => {
       try {
-        const msg: StreamFrame = JSON.parse(evt.data);
-        if (msg.type === 'frame' && msg.frame_data) {
-          setStreamFrame(msg.frame_data);
+        // Frames arrive as binary (header + JPEG); text messages are only keep-alive pings
+        if (!(evt.data instanceof ArrayBuffer) || evt.data.byteLength <= STREAM_FRAME_HEADER_BYTES) {
+          return;
+        }
+        const view = new DataView(evt.data);
+        const header: StreamFrameHeader = {
+          type: view.getUint8(0),
+          timestamp: view.getFloat64(1, true),
+          frame_number: view.getUint32(9, true),
+        };
+        if (header.type === STREAM_MSG_TYPE_FRAME) {
+          const jpeg = new Blob([evt.data.slice(STREAM_FRAME_HEADER_BYTES)], { type: 'image/jpeg' });
+          showStreamFrame(URL.createObjectURL(jpeg));
         }
       } catch (e) {
         console.error('Error parsing stream message:', e);
@@ -312,7 +341,7 @@ function UploadPage() {
   const closeStream = () => {
     setStreamModalOpen(false);
     setCurrentStreamJobId(null);
-    setStreamFrame(null);
+    showStreamFrame(null);
 
     try {
       if (streamWSRef.current) {
@@ -808,7 +837,7 @@ function UploadPage() {
                 <div className="bg-black rounded-lg flex items-center justify-center min-h-[200px] sm:min-h-[300px] md:min-h-[360px]">
                   {streamFrame ? (
                     <img
-                      src={`data:image/jpeg;base64,${streamFrame}`}
+                      src={streamFrame}
                       alt="Live stream"
                       className="max-w-full max-h-full h-auto rounded object-contain"
                     />
@@ -0,0 +1,16 @@
+/*
+  # Add get_max_tracker_id function
+
+  1. Changes
+    - Add `get_max_tracker_id()` returning the highest tracker_id in tracking_results (0 when empty)
+
+  2. Notes
+    - Additive only: no tables are dropped or altered
+    - The backend falls back to an ordered select on databases without this function
+*/
+
+CREATE OR REPLACE FUNCTION get_max_tracker_id()
+RETURNS INTEGER AS $$
+  SELECT COALESCE(MAX(tracker_id), 0)
+  FROM tracking_results;
+$$ LANGUAGE sql STABLE;
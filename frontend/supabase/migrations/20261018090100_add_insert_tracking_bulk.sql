@@ -0,0 +1,103 @@
+/*
+  # Add insert_tracking_bulk function
+
+  1. Changes
+    - Add `insert_tracking_bulk(...)` upserting tracking_results from parallel arrays
+      (one row per array index) with a single INSERT ... SELECT FROM unnest(...)
+
+  2. Notes
+    - Additive only: no tables are dropped or altered
+    - A missing date defaults to now()
+    - The backend falls back to a JSON row upsert on databases without this function
+*/
+
+CREATE OR REPLACE FUNCTION insert_tracking_bulk(
+        p_video_id INTEGER,
+        p_tracker_ids INTEGER [],
+        p_vehicle_types TEXT [],
+        p_statuses TEXT [],
+        p_compliance INTEGER [],
+        p_reaction_times DECIMAL [],
+        p_weather_conditions TEXT [],
+        p_temperatures DECIMAL [],
+        p_humidity INTEGER [],
+        p_visibility DECIMAL [],
+        p_precipitation_types TEXT [],
+        p_wind_speeds DECIMAL [],
+        p_dates TIMESTAMP WITH TIME ZONE []
+    ) RETURNS INTEGER AS $$
+DECLARE affected INTEGER;
+BEGIN
+INSERT INTO tracking_results (
+        tracker_id,
+        video_id,
+        vehicle_type,
+        status,
+        compliance,
+        reaction_time,
+        weather_condition,
+        temperature,
+        humidity,
+        visibility,
+        precipitation_type,
+        wind_speed,
+        date
+    )
+SELECT t.tracker_id,
+    p_video_id,
+    t.vehicle_type,
+    t.status,
+    COALESCE(t.compliance, 0),
+    t.reaction_time,
+    t.weather_condition,
+    t.temperature,
+    t.humidity,
+    t.visibility,
+    t.precipitation_type,
+    t.wind_speed,
+    COALESCE(t.date, NOW())
+FROM unnest(
+        p_tracker_ids,
+        p_vehicle_types,
+        p_statuses,
+        p_compliance,
+        p_reaction_times,
+        p_weather_conditions,
+        p_temperatures,
+        p_humidity,
+        p_visibility,
+        p_precipitation_types,
+        p_wind_speeds,
+        p_dates
+    ) AS t(
+        tracker_id,
+        vehicle_type,
+        status,
+        compliance,
+        reaction_time,
+        weather_condition,
+        temperature,
+        humidity,
+        visibility,
+        precipitation_type,
+        wind_speed,
+        date
+    ) ON CONFLICT (tracker_id) DO
+UPDATE
+SET video_id = EXCLUDED.video_id,
+    vehicle_type = EXCLUDED.vehicle_type,
+    status = EXCLUDED.status,
+    compliance = EXCLUDED.compliance,
+    reaction_time = EXCLUDED.reaction_time,
+    weather_condition = EXCLUDED.weather_condition,
+    temperature = EXCLUDED.temperature,
+    humidity = EXCLUDED.humidity,
+    visibility = EXCLUDED.visibility,
+    precipitation_type = EXCLUDED.precipitation_type,
+    wind_speed = EXCLUDED.wind_speed,
+    date = EXCLUDED.date,
+    updated_at = NOW();
+GET DIAGNOSTICS affected = ROW_COUNT;
+RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,29 @@
+/*
+  # Add upsert_vehicle_counts function
+
+  1. Changes
+    - Add `upsert_vehicle_counts(...)` upserting one video's counts for one day from
+      parallel arrays of vehicle types and counts in a single statement
+
+  2. Notes
+    - Additive only: no tables are dropped or altered
+    - Relies on the existing UNIQUE (video_id, vehicle_type, date) constraint on vehicle_counts
+    - The backend falls back to a JSON row upsert on databases without this function
+*/
+
+CREATE OR REPLACE FUNCTION upsert_vehicle_counts(
+        p_video_id INTEGER,
+        p_date DATE,
+        p_vehicle_types TEXT [],
+        p_counts INTEGER []
+    ) RETURNS VOID AS $$ BEGIN
+INSERT INTO vehicle_counts (video_id, vehicle_type, count, date)
+SELECT p_video_id,
+    t.vehicle_type,
+    t.count,
+    p_date
+FROM unnest(p_vehicle_types, p_counts) AS t(vehicle_type, count) ON CONFLICT (video_id, vehicle_type, date) DO
+UPDATE
+SET count = EXCLUDED.count;
+END;
+$$ LANGUAGE plpgsql;